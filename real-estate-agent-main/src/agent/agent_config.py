@@ -1,6 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
 import chromadb
 from models.agent_schedule_config import AgentScheduleConfig
+from models.user_profile import UserProfile
+from utils.geo_index import GeoIndex
+from utils.lexical_index import LexicalIndex
+from utils.listing_index import ListingIndex
+from utils.listing_table import LiveListingTable
 
 @dataclass
 class AgentDependencies:  
@@ -8,6 +14,26 @@ class AgentDependencies:
     chroma_db_listings: str
     n8n_webhook_url: str
     agent_schedule_config: AgentScheduleConfig
+    # Optional in-memory search backend used instead of querying Chroma
+    listing_index: Optional[ListingIndex] = None
+    # Chroma backend only: in-memory listing snapshot that id-only queries are hydrated from
+    listing_table: Optional[LiveListingTable] = None
+    # BM25 index built at ingest, used to rerank search candidates
+    lexical_index: Optional[LexicalIndex] = None
+    # Spatial index for neighborhood and radius searches; with a listing_index, use its `geo`
+    geo_index: Optional[GeoIndex] = None
+    # recommend_properties returns PropertySummary projections instead of full
+    # listings; the model fetches details with get_property_details when needed
+    compact_recommendations: bool = True
+    # Called with the tool name when a tool starts (e.g. to send interim voice updates)
+    on_tool_start: Optional[Callable[[str], Awaitable[None]]] = None
+    # Caller profile accumulated by update_user_profile, already normalized.
+    # Mutated in place, so give every session its own instance.
+    profile: UserProfile = field(default_factory=UserProfile)
+
+    async def notify_tool_start(self, tool_name: str) -> None:
+        if self.on_tool_start is not None:
+            await self.on_tool_start(tool_name)
 
 SYSTEM_PROMPT = """
 
@@ -36,6 +62,7 @@ Information to collect from the user:
 - bathrooms  
 - must_haves  
 - good_to_haves  
+- neighborhoods and radius_miles (only if mentioned)  
 
 Ask follow-up questions naturally and adaptively:
 
@@ -73,6 +100,14 @@ If the user doesn't provide an answer after two attempts, move on to the next qu
 
 ---
 
+Saving the profile:
+
+- Whenever the user gives you any of these fields, call `update_user_profile` with only the new or changed ones (full lists for must_haves and good_to_haves). It replies with the fields still missing.
+- The other tools read the saved profile, so never repeat it to them.
+- To search in the same response, give new fields to `recommend_properties` as `changes` instead.
+
+---
+
 Once UserProfile is complete (before recommending properties):
 
 Say:  
@@ -88,6 +123,8 @@ For each property:
 - Highlight two or three exciting or unique features in a friendly, casual tone.
 - Mention the price, size, or bed/bath count only if they are especially relevant.
 - Each description should be one to two sentences — quick, conversational, and natural.
+- A property with `relaxed` notes is a close match, not an exact one; say so briefly. Never search again just to loosen the filters.
+- Build descriptions from each property's `highlight`. Call `get_property_details` only when the caller asks about something not in the result.
 - Focus entirely on the positive aspects. Ignore drawbacks.
 - Do not use bullet points, numbered lists, or formatting like bold.
 
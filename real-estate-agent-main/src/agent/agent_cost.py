@@ -1,25 +1,120 @@
+import json
 import os
+from collections import OrderedDict
+from typing import Optional
 from dotenv import load_dotenv
 
-from tokonomics import calculate_pydantic_cost
+from tokonomics import ModelCosts, get_model_costs
 from pydantic_ai.usage import Usage
 
 load_dotenv()
 
 model = os.getenv("OPENAI_LLM_MODEL")
+pricing_cache_path = os.getenv("PRICING_CACHE_PATH", "model_pricing.json")
 
-async def compute_cost(usage: Usage) -> tuple[float, float, float]:
-    
-    costs = await calculate_pydantic_cost(
-        model=model,
-        usage=usage
+COST_TRACKER_MAX_SESSIONS = 1000
+
+_model_costs: Optional[ModelCosts] = None
+
+
+async def load_model_costs() -> ModelCosts:
+    """Resolve the model's per-token prices once and keep them in memory and on disk."""
+    global _model_costs
+    if _model_costs is not None:
+        return _model_costs
+
+    cached = {}
+    if os.path.exists(pricing_cache_path):
+        with open(pricing_cache_path, "r") as f:
+            cached = json.load(f)
+
+    costs = cached.get(model)
+    if costs is None:
+        costs = await get_model_costs(model)
+        if not costs:
+            raise ValueError(f"Could not calculate costs for model: {model}")
+        cached[model] = dict(costs)
+        with open(pricing_cache_path, "w") as f:
+            json.dump(cached, f, indent=2)
+
+    _model_costs = ModelCosts(**costs)
+    return _model_costs
+
+
+def usage_delta(before: Usage, after: Usage) -> Usage:
+    """Usage added between two snapshots of the same cumulative Usage."""
+    return Usage(
+        requests=after.requests - before.requests,
+        request_tokens=(after.request_tokens or 0) - (before.request_tokens or 0),
+        response_tokens=(after.response_tokens or 0) - (before.response_tokens or 0),
+        total_tokens=(after.total_tokens or 0) - (before.total_tokens or 0),
     )
 
-    if not costs:
-        raise ValueError(f"Could not calculate costs for model: {model}")
+
+def usage_cost(usage: Usage, costs: ModelCosts) -> tuple[float, float, float]:
+    prompt_cost = (usage.request_tokens or 0) * costs["input_cost_per_token"]
+    completion_cost = (usage.response_tokens or 0) * costs["output_cost_per_token"]
+    return prompt_cost, completion_cost, prompt_cost + completion_cost
+
+
+async def compute_cost(usage: Usage) -> tuple[float, float, float]:
+
+    costs = await load_model_costs()
+    prompt_cost, completion_cost, total_cost = usage_cost(usage, costs)
 
     return (
-        f"{costs.prompt_cost:.6f}",
-        f"{costs.completion_cost:.6f}",
-        f"{costs.total_cost:.6f}",
-    )
\ No newline at end of file
+        f"{prompt_cost:.6f}",
+        f"{completion_cost:.6f}",
+        f"{total_cost:.6f}",
+    )
+
+
+class CostTracker:
+    """Accumulates per-turn token deltas per session and in aggregate.
+
+    Recording is plain integer arithmetic, so it is cheap enough to do on the
+    request path; prices are applied only when metrics are read.
+    """
+
+    def __init__(self, max_sessions: int = COST_TRACKER_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.total = Usage()
+        self.turns = 0
+        self._sessions: OrderedDict[str, Usage] = OrderedDict()
+
+    def record(self, session_id: str, turn_usage: Usage) -> None:
+        self.total.incr(turn_usage)
+        self.turns += 1
+
+        session_usage = self._sessions.setdefault(session_id, Usage())
+        session_usage.incr(turn_usage)
+        self._sessions.move_to_end(session_id)
+        if len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _summary(self, usage: Usage, costs: Optional[ModelCosts]) -> dict:
+        summary = {
+            "requests": usage.requests,
+            "request_tokens": usage.request_tokens or 0,
+            "response_tokens": usage.response_tokens or 0,
+        }
+        if costs is not None:
+            prompt_cost, completion_cost, total_cost = usage_cost(usage, costs)
+            summary.update({
+                "prompt_cost": round(prompt_cost, 6),
+                "completion_cost": round(completion_cost, 6),
+                "total_cost": round(total_cost, 6),
+            })
+        return summary
+
+    def snapshot(self) -> dict:
+        return {
+            "model": model,
+            "pricing_loaded": _model_costs is not None,
+            "turns": self.turns,
+            "aggregate": self._summary(self.total, _model_costs),
+            "sessions": {
+                session_id: self._summary(usage, _model_costs)
+                for session_id, usage in self._sessions.items()
+            },
+        }
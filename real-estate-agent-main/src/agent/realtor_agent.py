@@ -39,6 +39,8 @@ realtor_agent = Agent(
 )
 
 # Force import of tools so decorators run
+from agent.tools import update_user_profile
 from agent.tools import recommend_properties
+from agent.tools import get_property_details
 from agent.tools import get_agent_availability
 from agent.tools import schedule_appointment
\ No newline at end of file
@@ -10,20 +10,23 @@ from typing import Optional
 
 # Local application imports
 from agent.agent_config import AgentDependencies
-from models.user_profile import UserProfile, normalize_user_profile
 from utils.time_utils import compute_available_slots, format_slots_for_llm
 from agent.realtor_agent import realtor_agent
 
+# When the requested day is fully booked, offer the next openings instead
+AVAILABILITY_LOOKAHEAD_DAYS = 5
+AVAILABILITY_LOOKAHEAD_SLOTS = 6
+
 
 @realtor_agent.tool
 async def get_agent_availability(
     ctx: RunContext[AgentDependencies],
-    profile: UserProfile,
     date_time_preference: Optional[str] = None
 ) -> list[str]:
 
-    normalized_user_profile = normalize_user_profile(profile)
-    print(f"profile in get_agent_availability {normalized_user_profile}")
+    await ctx.deps.notify_tool_start("get_agent_availability")
+
+    print(f"profile in get_agent_availability {ctx.deps.profile}")
 
     agent_timezone = ctx.deps.agent_schedule_config.timezone
     n8n_webhook_url = ctx.deps.n8n_webhook_url
@@ -66,7 +69,15 @@ async def get_agent_availability(
 
     agent_schedule_config = ctx.deps.agent_schedule_config
     # Now compute free slots based on parsed datetime
-    available_slots = compute_available_slots(parsed_datetime, agent_schedule_config, n8n_webhook_url)
+    available_slots = await compute_available_slots(parsed_datetime, agent_schedule_config, n8n_webhook_url)
+    if not available_slots:
+        available_slots = await compute_available_slots(
+            parsed_datetime,
+            agent_schedule_config,
+            n8n_webhook_url,
+            days=AVAILABILITY_LOOKAHEAD_DAYS,
+            max_slots=AVAILABILITY_LOOKAHEAD_SLOTS
+        )
     available_slots_formatted = format_slots_for_llm(available_slots, agent_timezone)
     print(f"formatted available slots for LLM {available_slots_formatted}")
 
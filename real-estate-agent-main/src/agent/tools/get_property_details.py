@@ -0,0 +1,22 @@
+# Third-party library imports
+from pydantic_ai import RunContext
+
+# Local application imports
+from agent.agent_config import AgentDependencies
+from agent.realtor_agent import realtor_agent
+from models.property_recommendation import PropertyRecommendation
+from utils.listing_search import fetch_listing
+
+
+@realtor_agent.tool
+async def get_property_details(
+    ctx: RunContext[AgentDependencies],
+    listing_id: str
+) -> PropertyRecommendation | str:
+
+    await ctx.deps.notify_tool_start("get_property_details")
+
+    details = fetch_listing(ctx.deps, listing_id)
+    if details is None:
+        return f"There is no listing with id {listing_id}. Use the listing_id of a recommended property."
+    return details
@@ -1,61 +1,70 @@
+# Standard library imports
+from functools import partial
+from typing import Optional
+
 # Third-party library imports
 from pydantic_ai import RunContext
 
 # Local application imports
 from agent.agent_config import AgentDependencies
+from utils.embedding_cache import get_embedding_cache
 from utils.embedding_utils import get_embedding, profile_to_text
+from utils.listing_search import ListingFilter, search_listings_relaxed
+from utils.rerank import RERANK_CANDIDATES, lexical_query, rerank_results
 from agent.realtor_agent import realtor_agent
-from models.property_recommendation import parse_chroma_results
-from models.user_profile import (
-    UserProfile,
-    apply_defaults_to_profile,
-    normalize_user_profile,
-    validate_user_profile,
-)
+from models.property_recommendation import parse_chroma_results, summarize_chroma_results
+from models.user_profile import UserProfile, apply_defaults_to_profile, merge_profile_update, validate_user_profile
 
 
 @realtor_agent.tool
 async def recommend_properties(
     ctx: RunContext[AgentDependencies],
-    profile: UserProfile
+    changes: Optional[UserProfile] = None
 ) -> dict:
 
+    await ctx.deps.notify_tool_start("recommend_properties")
+
+    # Fields given in the same response as the search; merged here because a
+    # parallel update_user_profile call has no guaranteed order against this one
+    if changes is not None:
+        updated_fields = merge_profile_update(ctx.deps.profile, changes)
+        print(f"profile updated {updated_fields} in recommend_properties")
+
+    # Saved by update_user_profile, already normalized field by field
+    profile = ctx.deps.profile
     print(f"user_profile in recommend_properties {profile}")
 
     validation_errors = validate_user_profile(profile)
     if validation_errors:
         return validation_errors
 
-    user_profile_with_defaults = apply_defaults_to_profile(profile)
-    normalized_user_profile = normalize_user_profile(user_profile_with_defaults)
-    print(f"normalized profile: {normalized_user_profile}")
+    # Defaults are in normalized form too
+    normalized_user_profile = apply_defaults_to_profile(profile)
 
     query = profile_to_text(normalized_user_profile)
-    query_embedding = get_embedding(query)
-
-    price_tolerance = 50000
-    sqft_tolerance = 300
+    query_embedding = await get_embedding(query)
+    print(f"embedding cache stats: {get_embedding_cache().stats()}")
 
-    chroma_client = ctx.deps.chroma_client
-    chroma_db_listings = ctx.deps.chroma_db_listings
-
-    listing_collection = chroma_client.get_collection(chroma_db_listings)
-    # Query Chroma
-    results = listing_collection.query(
-        query_embeddings=[query_embedding],
+    listing_filter = ListingFilter.from_profile(normalized_user_profile, ctx.deps.geo_index)
+    # Over-fetch and rerank by text match, price fit and freshness, not distance alone
+    rerank = partial(
+        rerank_results,
+        query=lexical_query(normalized_user_profile),
+        budget=int(normalized_user_profile.budget),
+        lexical_index=ctx.deps.lexical_index
+    )
+    # Loosens the filter in tiers if needed, so the model never has to retry
+    results = search_listings_relaxed(
+        ctx.deps,
+        query_embedding,
+        listing_filter,
         n_results=3,
-        where = {
-            "$and": [
-                {"city": {"$eq": normalized_user_profile.location}},
-                {"property_type": {"$eq": normalized_user_profile.property_type}},
-                {"square_feet": {"$gte": int(normalized_user_profile.sqft) - sqft_tolerance}},
-                {"price": {"$gte": int(normalized_user_profile.budget) - price_tolerance}},
-                {"price": {"$lte": int(normalized_user_profile.budget) + price_tolerance}},
-                {"bedrooms": {"$gte": int(normalized_user_profile.bedrooms)}},
-                {"bathrooms": {"$gte": int(normalized_user_profile.bathrooms)}}
-            ]
-        }
-
+        rerank=rerank,
+        candidates=RERANK_CANDIDATES
     )
+    # Every field returned here is resent as prompt tokens on later turns
+    listing_table = ctx.deps.listing_table
+    if ctx.deps.compact_recommendations:
+        return listing_table.summarize_results(results) if listing_table else summarize_chroma_results(results)
     recommendations = parse_chroma_results(results)
     return recommendations
\ No newline at end of file
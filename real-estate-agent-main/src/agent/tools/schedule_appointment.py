@@ -10,20 +10,29 @@ from pydantic_ai import RunContext
 from utils.appointment_utils import send_appointment_to_n8n
 from agent.agent_config import AgentDependencies
 from agent.realtor_agent import realtor_agent
-from models.property_recommendation import PropertyRecommendation
-from models.user_profile import UserProfile, normalize_user_profile
+from models.user_profile import validate_phone_number
+from utils.listing_search import fetch_listing
 
 
 @realtor_agent.tool
 async def schedule_appointment(
         ctx: RunContext[AgentDependencies],
-        profile: UserProfile,
-        property: PropertyRecommendation,
+        listing_id: str,
         selected_date_time: str) -> list[str]:
 
-    normalized_profile = normalize_user_profile(profile)
+    await ctx.deps.notify_tool_start("schedule_appointment")
+
+    # Saved by update_user_profile, already normalized field by field
+    normalized_profile = ctx.deps.profile
     print(f"user_profile in schedule_appointment {normalized_profile}")
 
+    if not normalized_profile.name or not validate_phone_number(normalized_profile.phone):
+        return "I still need the caller's name and phone number before booking. Save them with update_user_profile first."
+
+    property = fetch_listing(ctx.deps, listing_id)
+    if property is None:
+        return f"There is no listing with id {listing_id}. Use the listing_id of a recommended property."
+
     agent_timezone = ctx.deps.agent_schedule_config.timezone
     tz = pytz.timezone(agent_timezone)
     now = datetime.now(tz)
@@ -48,5 +57,5 @@ async def schedule_appointment(
     end_dt = start_dt + timedelta(hours=1)
 
     n8n_webhook_url = ctx.deps.n8n_webhook_url
-    appt_response = send_appointment_to_n8n(normalized_profile, property, start_dt, end_dt, n8n_webhook_url)
+    appt_response = await send_appointment_to_n8n(normalized_profile, property, start_dt, end_dt, n8n_webhook_url)
     return appt_response
\ No newline at end of file
@@ -0,0 +1,26 @@
+# Third-party library imports
+from pydantic_ai import RunContext
+
+# Local application imports
+from agent.agent_config import AgentDependencies
+from agent.realtor_agent import realtor_agent
+from models.user_profile import UserProfile, merge_profile_update, missing_profile_fields
+
+
+@realtor_agent.tool
+async def update_user_profile(
+    ctx: RunContext[AgentDependencies],
+    changes: UserProfile
+) -> dict:
+
+    # Tools called in the same response may run in any order, so a search made
+    # alongside this call can miss the update; recommend_properties takes its
+    # own `changes` for that case
+    updated_fields = merge_profile_update(ctx.deps.profile, changes)
+    print(f"profile updated {updated_fields}: {ctx.deps.profile}")
+
+    # Keep the reply tiny; the model only needs to know what to ask next
+    return {
+        "updated": updated_fields,
+        "missing": missing_profile_fields(ctx.deps.profile)
+    }
@@ -0,0 +1,83 @@
+# Benchmark: in-memory NumPy ListingIndex vs. the Chroma query path.
+#
+# Run from src/:
+#     python -m benchmarks.bench_listing_search
+
+# Standard library imports
+import random
+import shutil
+import time
+
+# Third-party library imports
+import numpy as np
+
+# Local application imports
+from benchmarks.fixtures import build_temp_collection, load_listings, random_unit_vectors
+from utils.listing_index import ListingIndex
+from utils.listing_search import ListingFilter
+
+
+def sample_filters(listings: list[dict], count: int, seed: int = 1) -> list[ListingFilter]:
+    # Filters centred on real listings so most queries have matches
+    rng = random.Random(seed)
+    filters = []
+    for item in rng.sample(listings, count):
+        filters.append(ListingFilter(
+            city=item["city"],
+            property_types=[item["property_type"]],
+            price_min=item["price"] - 150000,
+            price_max=item["price"] + 150000,
+            sqft_min=item["square_feet"] - 1000,
+            bedrooms_min=max(item["bedrooms"] - 1, 0),
+            bathrooms_min=max(item["bathrooms"] - 1, 0),
+        ))
+    return filters
+
+
+def percentile_ms(samples: list[float], q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000
+
+
+def run(queries: int = 200, n_results: int = 3):
+    listings = load_listings()
+    embeddings = random_unit_vectors(len(listings))
+    client, collection, path = build_temp_collection(listings, embeddings)
+
+    try:
+        start = time.perf_counter()
+        index = ListingIndex.from_chroma_collection(collection)
+        print(f"built ListingIndex over {len(index)} listings in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        filters = sample_filters(listings, queries)
+        query_vectors = random_unit_vectors(queries, seed=42)
+
+        chroma_times, numpy_times, overlap = [], [], []
+        for listing_filter, query in zip(filters, query_vectors):
+            query = query.tolist()
+
+            start = time.perf_counter()
+            chroma_result = collection.query(
+                query_embeddings=[query],
+                n_results=n_results,
+                where=listing_filter.to_chroma_where()
+            )
+            chroma_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            numpy_result = index.query(query, listing_filter, n_results)
+            numpy_times.append(time.perf_counter() - start)
+
+            expected = set(chroma_result["ids"][0])
+            if expected:
+                overlap.append(len(expected & set(numpy_result["ids"][0])) / len(expected))
+
+        print(f"{'backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, samples in [("chroma", chroma_times), ("numpy", numpy_times)]:
+            print(f"{name:<8} {percentile_ms(samples, 50):>8.3f} {percentile_ms(samples, 95):>8.3f} {percentile_ms(samples, 99):>8.3f}")
+        print(f"top-{n_results} agreement with Chroma: {np.mean(overlap) * 100:.1f}% over {len(overlap)} non-empty queries")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
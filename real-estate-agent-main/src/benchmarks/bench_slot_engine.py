@@ -0,0 +1,73 @@
+# Benchmark: sweep-line availability engine vs. the original per-slot scan.
+#
+# Run from src/:
+#     python -m benchmarks.bench_slot_engine
+
+# Standard library imports
+import random
+import timeit
+from datetime import datetime, timedelta
+
+# Third-party library imports
+import pytz
+
+# Local application imports
+from models.agent_schedule_config import AgentScheduleConfig
+from utils.time_utils import find_available_slots
+
+
+def generate_busy_calendar(start_day, days: int, events: int, tz, seed: int = 7) -> list[tuple[datetime, datetime]]:
+    rng = random.Random(seed)
+    busy_slots = []
+    for _ in range(events):
+        day = start_day + timedelta(days=rng.randrange(days))
+        start = tz.localize(datetime.combine(day, datetime.min.time())) + timedelta(minutes=rng.randrange(7 * 60, 19 * 60, 5))
+        busy_slots.append((start, start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90]))))
+    return busy_slots
+
+
+def legacy_available_slots(start_day, config: AgentScheduleConfig, busy_slots, days: int) -> list[datetime]:
+    # The original O(slots x busy) scan, one day at a time
+    tz = pytz.timezone(config.timezone)
+    available_slots = []
+    for offset in range(days):
+        day = start_day + timedelta(days=offset)
+        current = tz.localize(datetime.combine(day, config.work_start))
+        end_dt = tz.localize(datetime.combine(day, config.work_end)) - config.appointment_duration
+        while current <= end_dt:
+            proposed_end = current + config.appointment_duration
+            conflict = any(
+                (current < busy_end + config.schedule_buffer and proposed_end > busy_start - config.schedule_buffer)
+                for busy_start, busy_end in busy_slots
+            )
+            if not conflict:
+                available_slots.append(current)
+            current += config.slot_granularity
+    return available_slots
+
+
+def run():
+    config = AgentScheduleConfig(
+        slot_granularity=timedelta(minutes=15),
+        schedule_buffer=timedelta(minutes=10),
+        appointment_duration=timedelta(minutes=30),
+    )
+    tz = pytz.timezone(config.timezone)
+    start_day = datetime.now(tz).date()
+
+    print(f"{'days':>5} {'events':>7} {'legacy ms':>10} {'sweep ms':>9} {'speedup':>8}")
+    for days, events in [(1, 50), (1, 200), (7, 300), (14, 800), (30, 2000)]:
+        busy_slots = generate_busy_calendar(start_day, days, events, tz)
+
+        expected = legacy_available_slots(start_day, config, busy_slots, days)
+        actual = find_available_slots(start_day, config, busy_slots, days=days)
+        assert actual == expected, "sweep engine disagrees with the legacy scan"
+
+        number = 5
+        legacy = timeit.timeit(lambda: legacy_available_slots(start_day, config, busy_slots, days), number=number) / number
+        sweep = timeit.timeit(lambda: find_available_slots(start_day, config, busy_slots, days=days), number=number) / number
+        print(f"{days:>5} {events:>7} {legacy * 1000:>10.2f} {sweep * 1000:>9.3f} {legacy / sweep:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,303 @@
+# Microbenchmarks for the agent's tool hot paths, fully offline.
+#
+# Embeddings come from the local hashing provider, n8n is a local HTTP stub and
+# listings are seeded into a temporary Chroma store, so runs are repeatable.
+#
+# Run from src/:
+#     python -m benchmarks.bench_tools --output before.json
+#     python -m benchmarks.bench_tools --output after.json --compare before.json
+
+# Standard library imports
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Must be set before the embedding modules read them
+os.environ["EMBEDDING_PROVIDER"] = "hashing"
+os.environ.pop("EMBEDDING_MODEL", None)
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_cache_"), "embedding_cache.db")
+
+# Third-party library imports
+import numpy as np
+import pytz
+
+# Local application imports
+from agent.agent_config import AgentDependencies
+from agent.realtor_agent import realtor_agent  # noqa: F401 (registers the tools)
+from agent.tools.get_agent_availability import get_agent_availability
+from agent.tools.get_property_details import get_property_details
+from agent.tools.recommend_properties import recommend_properties
+from agent.tools.schedule_appointment import schedule_appointment
+from agent.tools.update_user_profile import update_user_profile
+from benchmarks.fixtures import BENCH_COLLECTION, N8nStub, build_temp_collection, embed_listings, load_listings
+from models.agent_schedule_config import AgentScheduleConfig
+from models.property_recommendation import parse_chroma_results
+from models.user_profile import UserProfile, merge_profile_update
+from utils.busy_slot_cache import get_busy_slot_cache
+from utils.embedding_providers import get_embedding_provider
+from utils.geo_index import GeoIndex
+from utils.lexical_index import LexicalIndex
+from utils.listing_index import ListingIndex
+from utils.listing_table import LiveListingTable
+from utils.rerank import RERANK_CANDIDATES, rerank_results
+from utils.time_utils import compute_available_slots, format_slots_for_llm
+
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_ITERATIONS = 200
+DEFAULT_WARMUP = 20
+ALLOC_ITERATIONS = 25
+PROFILE_COUNT = 50
+RADIUS_MILES = 1000
+REGRESSION_THRESHOLD = 0.20
+
+
+def sample_profiles(listings: list[dict], count: int = PROFILE_COUNT) -> list[UserProfile]:
+    step = max(len(listings) // count, 1)
+    return [
+        UserProfile(
+            name="Bench Caller",
+            phone="(312) 555-0100",
+            buyOrRent="buy",
+            location=item["city"].lower(),
+            property_type=item["property_type"],
+            sqft=f"{item['square_feet']:,} sqft",
+            budget=str(item["price"]),
+            bedrooms=item["bedrooms"],
+            bathrooms=item["bathrooms"],
+            must_haves=["garage"],
+            good_to_haves=["backyard"],
+        )
+        for item in listings[::step][:count]
+    ]
+
+
+def near_neighborhood(profile: UserProfile, neighborhood: str) -> UserProfile:
+    """`profile`, searching within RADIUS_MILES of a neighborhood's centroid."""
+    return profile.model_copy(update={"neighborhoods": [neighborhood], "radius_miles": RADIUS_MILES})
+
+
+def with_saved_profile(deps: AgentDependencies, profile: UserProfile) -> SimpleNamespace:
+    """Tool context whose session profile was saved through update_user_profile."""
+    saved = UserProfile()
+    merge_profile_update(saved, profile)
+    return SimpleNamespace(deps=replace(deps, profile=saved))
+
+
+def percentile_ms(samples: list[float], q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000
+
+
+async def call(fn):
+    result = fn()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def measure(fn, iterations: int, warmup: int) -> dict:
+    """Time `fn` (sync or async) per call, then measure its allocations.
+
+    Allocations are measured in a separate tracemalloc pass because tracing
+    slows every allocation down. They include the n8n stub's server thread.
+    """
+    for _ in range(warmup):
+        await call(fn)
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call(fn)
+        samples.append(time.perf_counter() - start)
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(ALLOC_ITERATIONS):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await call(fn)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile_ms(samples, 50), 4),
+        "p95_ms": round(percentile_ms(samples, 95), 4),
+        "p99_ms": round(percentile_ms(samples, 99), 4),
+        "mean_ms": round(float(np.mean(samples)) * 1000, 4),
+        "peak_alloc_kib": round(float(np.median(peaks)) / 1024, 2),
+        "retained_bytes": int(np.median(retained)),
+    }
+
+
+def build_cases(deps: AgentDependencies, numpy_deps: AgentDependencies, profiles: list[UserProfile],
+                sample_result: dict, candidates_result: dict) -> dict:
+    contexts = [with_saved_profile(deps, profile) for profile in profiles]
+    untabled_contexts = [with_saved_profile(replace(deps, listing_table=None), profile) for profile in profiles]
+    numpy_contexts = [with_saved_profile(numpy_deps, profile) for profile in profiles]
+    neighborhoods = sorted(deps.geo_index.centroids)
+    radius_profiles = [near_neighborhood(p, neighborhoods[i % len(neighborhoods)]) for i, p in enumerate(profiles)]
+    radius_contexts = [with_saved_profile(deps, profile) for profile in radius_profiles]
+    numpy_radius_contexts = [with_saved_profile(numpy_deps, profile) for profile in radius_profiles]
+    centroid = deps.geo_index.centroids[neighborhoods[0]]
+    ctx = contexts[0]
+    config = deps.agent_schedule_config
+    tz = pytz.timezone(config.timezone)
+    tomorrow = (datetime.now(tz) + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    slots = [(tomorrow + timedelta(hours=9, minutes=30 * i)).isoformat() for i in range(12)]
+    recommendation = parse_chroma_results(sample_result)[0]
+    busy_slot_cache = get_busy_slot_cache()
+
+    # Cycle through profiles so searches aren't all identical
+    def next_index(counter=iter(range(10 ** 9))):
+        return next(counter) % len(profiles)
+
+    async def cold_slots():
+        busy_slot_cache.invalidate(deps.n8n_webhook_url)
+        return await compute_available_slots(tomorrow, config, deps.n8n_webhook_url)
+
+    return {
+        "update_user_profile": lambda: update_user_profile(SimpleNamespace(deps=replace(deps, profile=UserProfile())), profiles[next_index()]),
+        "parse_chroma_results": lambda: parse_chroma_results(sample_result),
+        "listing_table.summarize_results": lambda: deps.listing_table.summarize_results(sample_result),
+        f"rerank_results[{RERANK_CANDIDATES}]": lambda: rerank_results(
+            candidates_result, "garage backyard", 400000, deps.lexical_index),
+        "format_slots_for_llm": lambda: format_slots_for_llm(slots, config.timezone),
+        "compute_available_slots[cached]": lambda: compute_available_slots(tomorrow, config, deps.n8n_webhook_url),
+        "compute_available_slots[n8n]": cold_slots,
+        "recommend_properties[chroma]": lambda: recommend_properties(contexts[next_index()]),
+        "recommend_properties[no table]": lambda: recommend_properties(untabled_contexts[next_index()]),
+        "recommend_properties[numpy]": lambda: recommend_properties(numpy_contexts[next_index()]),
+        f"geo_index.mask_within[{RADIUS_MILES}mi]": lambda: deps.geo_index.mask_within([centroid], RADIUS_MILES),
+        "recommend_properties[chroma,radius]": lambda: recommend_properties(radius_contexts[next_index()]),
+        "recommend_properties[numpy,radius]": lambda: recommend_properties(numpy_radius_contexts[next_index()]),
+        "get_property_details": lambda: get_property_details(ctx, recommendation.listing_id),
+        "get_agent_availability": lambda: get_agent_availability(ctx, "tomorrow afternoon"),
+        "schedule_appointment": lambda: schedule_appointment(ctx, recommendation.listing_id, "tomorrow at 3pm"),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print per-case deltas against `baseline`; return the names that regressed."""
+    regressions = []
+    print(f"\ncompared with {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'case':<34} {'p50 before':>11} {'p50 after':>10} {'delta':>8} {'alloc delta':>12}")
+    for name, after in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print(f"{name:<34} {'(new)':>11} {after['p50_ms']:>10.3f}")
+            continue
+        delta = (after["p50_ms"] - before["p50_ms"]) / before["p50_ms"] if before["p50_ms"] else 0.0
+        alloc_delta = after["peak_alloc_kib"] - before["peak_alloc_kib"]
+        regressed = delta > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<34} {before['p50_ms']:>11.3f} {after['p50_ms']:>10.3f} {delta * 100:>7.1f}% "
+              f"{alloc_delta:>+10.1f}KiB{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+async def run_cases(iterations: int, warmup: int, only: list[str] = None) -> dict:
+    listings = load_listings()
+    provider = get_embedding_provider()
+    embeddings, documents = await embed_listings(provider, listings)
+    client, collection, path = build_temp_collection(listings, embeddings, documents, metadata=provider.collection_tags())
+
+    try:
+        with N8nStub() as n8n_stub:
+            deps = AgentDependencies(
+                chroma_client=client,
+                chroma_db_listings=BENCH_COLLECTION,
+                n8n_webhook_url=n8n_stub.url,
+                agent_schedule_config=AgentScheduleConfig(timezone="America/Chicago"),
+                lexical_index=LexicalIndex.from_chroma_collection(collection),
+                geo_index=GeoIndex.from_chroma_collection(collection),
+                listing_table=LiveListingTable(client, BENCH_COLLECTION),
+            )
+            deps.listing_table.load()
+            listing_index = ListingIndex.from_chroma_collection(collection)
+            numpy_deps = replace(deps, listing_index=listing_index, geo_index=listing_index.geo, listing_table=None)
+            sample_result = collection.query(query_embeddings=[embeddings[0].tolist()], n_results=3)
+            candidates_result = collection.query(query_embeddings=[embeddings[0].tolist()], n_results=RERANK_CANDIDATES)
+            cases = build_cases(deps, numpy_deps, sample_profiles(listings), sample_result, candidates_result)
+
+            results = {}
+            print(f"{'case':<34} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>9}")
+            for name, fn in cases.items():
+                if only and not any(pattern in name for pattern in only):
+                    continue
+                # The tools log every call; keep that cost but not the noise
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    stats = await measure(fn, iterations, warmup)
+                results[name] = stats
+                print(f"{name:<34} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['peak_alloc_kib']:>9.1f}")
+            return results
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline microbenchmarks for the agent's tool hot paths.")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--only", nargs="*", help="run only cases whose name contains one of these substrings")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative p50 slowdown that counts as a regression (default 0.20)")
+    args = parser.parse_args()
+
+    cases = asyncio.run(run_cases(args.iterations, args.warmup, args.only))
+    results = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "cases": cases,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
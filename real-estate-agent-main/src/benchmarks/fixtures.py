@@ -0,0 +1,137 @@
+# Shared offline fixtures for the benchmark scripts.
+
+# Standard library imports
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-party library imports
+import chromadb
+import numpy as np
+
+# Local application imports
+from utils.amenities import amenity_metadata
+from utils.listing_table import stamp_listing_revision
+
+LISTINGS_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "chicago_listings_1000.json")
+EMBEDDING_DIMENSION = 1536  # matches text-embedding-3-small
+BENCH_COLLECTION = "bench_listings"
+N8N_STUB_BUSY_PER_DAY = 4
+
+
+def load_listings() -> list[dict]:
+    with open(LISTINGS_PATH, "r") as f:
+        return json.load(f)
+
+
+def random_unit_vectors(count: int, dimension: int = EMBEDDING_DIMENSION, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_temp_collection(
+    listings: list[dict],
+    embeddings: np.ndarray,
+    documents: list[str] = None,
+    metadata: dict = None,
+    path: str = None,
+):
+    """Seed a throwaway persistent Chroma store; returns (client, collection, path).
+
+    Metadata gets the same amenity index fields and content_hash as load_listings.py
+    writes, and the collection gets a revision stamp like after an ingest.
+    """
+    path = path or tempfile.mkdtemp(prefix="bench_chroma_")
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection(BENCH_COLLECTION, metadata=metadata)
+
+    documents = documents or [item["description"] for item in listings]
+    for i in range(0, len(listings), 500):
+        batch = listings[i:i + 500]
+        batch_documents = documents[i:i + 500]
+        collection.add(
+            ids=[item["listing_id"] for item in batch],
+            documents=batch_documents,
+            metadatas=[
+                {**item, **amenity_metadata(item["description"]), "content_hash": hashlib.sha256(document.encode("utf-8")).hexdigest()}
+                for item, document in zip(batch, batch_documents)
+            ],
+            embeddings=embeddings[i:i + 500].tolist(),
+        )
+    stamp_listing_revision(client, BENCH_COLLECTION)
+    return client, collection, path
+
+
+async def embed_listings(provider, listings: list[dict]) -> tuple[np.ndarray, list[str]]:
+    """Embed listing descriptions with `provider`; returns (embeddings, documents)."""
+    documents = [item["description"] for item in listings]
+    embeddings = await provider.embed_batch(documents)
+    return np.asarray(embeddings, dtype=np.float32), documents
+
+
+class N8nStub:
+    """Local HTTP stand-in for the n8n webhook.
+
+    Answers `get_busy_slots` with a few deterministic busy blocks per requested
+    day and `schedule_appointment` with a confirmation, after `latency_ms`.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests += 1
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+
+                if body.get("mode") == "get_busy_slots":
+                    response = {"calendars": {"agent": {"busy": stub.busy_slots(body["start"], body["end"])}}}
+                else:
+                    response = {"confirmation_message": "Your appointment has been scheduled."}
+
+                encoded = json.dumps(response).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/webhook"
+
+    @staticmethod
+    def busy_slots(start: str, end: str) -> list[dict]:
+        start_dt, end_dt = datetime.fromisoformat(start), datetime.fromisoformat(end)
+        day = start_dt.replace(hour=9, minute=0, second=0, microsecond=0)
+        busy = []
+        while day < end_dt:
+            for i in range(N8N_STUB_BUSY_PER_DAY):
+                block_start = day + timedelta(hours=2 * i, minutes=30 * (i % 2))
+                busy.append({"start": block_start.isoformat(), "end": (block_start + timedelta(minutes=45)).isoformat()})
+            day += timedelta(days=1)
+        return busy
+
+    def __enter__(self) -> "N8nStub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,284 @@
+# Load test for the VAPI chat completions endpoint.
+#
+# Serves voice_vapi.app with uvicorn in-process, swaps the LLM for the scripted
+# FunctionModel and points n8n at a local stub, then runs many concurrent
+# multi-turn calls (distinct call ids) at each concurrency stage. The client
+# shares the server's event loop, so loop lag includes client-side overhead.
+#
+# Run from src/:
+#     python -m benchmarks.load_vapi --stages 1 5 10 25 50
+
+# Standard library imports
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+# Third-party library imports
+import httpx
+import numpy as np
+import uvicorn
+
+# Local application imports
+from benchmarks.fixtures import BENCH_COLLECTION, N8nStub, build_temp_collection, embed_listings, load_listings
+from benchmarks.scripted_model import build_scripted_model, profile_message
+
+DEFAULT_STAGES = [1, 5, 10, 25, 50]
+DEFAULT_SESSIONS_PER_WORKER = 3
+LOOP_LAG_INTERVAL_SECONDS = 0.01
+SCRIPT_TURNS = [
+    "Hi, I'm looking for a place.",
+    None,  # the profile turn, filled in per caller
+    "Great, when can I see it? Is it available tomorrow afternoon?",
+    "Please book tomorrow at 3pm.",
+]
+
+
+def caller_profile(listing: dict) -> dict:
+    return {
+        "name": "Load Caller",
+        "phone": "3125550100",
+        "buyOrRent": "buy",
+        "location": listing["city"],
+        "property_type": listing["property_type"],
+        "sqft": str(listing["square_feet"]),
+        "budget": str(listing["price"]),
+        "bedrooms": listing["bedrooms"],
+        "bathrooms": listing["bathrooms"],
+        "must_haves": [],
+        "good_to_haves": [],
+    }
+
+
+def current_rss_bytes() -> int:
+    # /proc gives the current RSS on Linux; elsewhere fall back to the peak
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentiles_ms(samples: list[float]) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    return {f"p{q}": round(float(np.percentile(samples, q)) * 1000, 2) for q in (50, 95, 99)}
+
+
+class LoopLagMonitor:
+    """Samples how late a periodic sleep wakes up, i.e. event-loop blocking."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - expected, 0.0))
+
+    def __enter__(self) -> "LoopLagMonitor":
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def run_call(client: httpx.AsyncClient, call_id: str, listing: dict, stats: dict):
+    messages = []
+    for text in SCRIPT_TURNS:
+        text = text or profile_message("I want to buy.", caller_profile(listing))
+        messages.append({"role": "user", "content": text})
+        body = {
+            "model": "gpt-4",
+            "call": {"id": call_id, "type": "webCall"},
+            "messages": messages,
+            "temperature": 0.3,
+            "max_tokens": 250,
+            "metadata": {},
+            "timestamp": int(time.time() * 1000),
+            "stream": True,
+        }
+
+        start = time.perf_counter()
+        first_chunk = None
+        reply = ""
+        try:
+            async with client.stream("POST", "/vapi-webhook/chat/completions", json=body) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: ") or line == "data: [DONE]":
+                        continue
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    delta = json.loads(line[6:])["choices"][0]["delta"]
+                    reply += delta.get("content", "")
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            stats["errors"].append(f"{call_id}: {type(e).__name__}: {e}")
+            return
+
+        stats["turn_seconds"].append(time.perf_counter() - start)
+        stats["first_chunk_seconds"].append(first_chunk or 0.0)
+        messages.append({"role": "assistant", "content": reply})
+
+
+async def run_stage(client: httpx.AsyncClient, voice_vapi, concurrency: int, sessions_per_worker: int,
+                    listings: list[dict], stage: int) -> dict:
+    stats = {"turn_seconds": [], "first_chunk_seconds": [], "errors": []}
+    rss_before = current_rss_bytes()
+
+    async def worker(worker_id: int):
+        for n in range(sessions_per_worker):
+            index = (stage * 10007 + worker_id * sessions_per_worker + n) % len(listings)
+            await run_call(client, f"load-{stage}-{worker_id}-{n}", listings[index], stats)
+
+    with LoopLagMonitor() as lag:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    # Measure while the sessions are still live, then hang them all up
+    session_stats = voice_vapi.session_store.stats()
+    sessions = concurrency * sessions_per_worker
+    rss_growth = current_rss_bytes() - rss_before
+    for session in session_stats["sessions"]:
+        await client.post("/vapi-webhook/events", json={
+            "message": {"type": "end-of-call-report", "call": {"id": session["session_id"], "type": "webCall"}}
+        })
+
+    turns = len(stats["turn_seconds"])
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "turns": turns,
+        "errors": len(stats["errors"]),
+        "error_samples": stats["errors"][:5],
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(turns / elapsed, 2) if elapsed else None,
+        "turn_ms": percentiles_ms(stats["turn_seconds"]),
+        "first_chunk_ms": percentiles_ms(stats["first_chunk_seconds"]),
+        "loop_lag_ms": {**percentiles_ms(lag.samples), "max": round(max(lag.samples, default=0.0) * 1000, 2)},
+        "rss_growth_kib_per_session": round(rss_growth / sessions / 1024, 1),
+        "history_bytes_per_session": round(session_stats["approx_bytes"] / max(session_stats["live_sessions"], 1)),
+    }
+
+
+def print_stage(result: dict):
+    columns = [
+        (result["concurrency"], 5), (result["sessions"], 8), (result["turns_per_second"], 9),
+        (result["first_chunk_ms"]["p50"], 9), (result["turn_ms"]["p50"], 9), (result["turn_ms"]["p95"], 9),
+        (result["turn_ms"]["p99"], 9), (result["loop_lag_ms"]["p99"], 9), (result["loop_lag_ms"]["max"], 9),
+        (result["rss_growth_kib_per_session"], 10), (result["history_bytes_per_session"], 9), (result["errors"], 6),
+    ]
+    print(" ".join(f"{'-' if value is None else value:>{width}}" for value, width in columns))
+    for sample in result["error_samples"]:
+        print(f"      error: {sample}")
+
+
+async def run(args) -> list[dict]:
+    listings = load_listings()
+
+    workdir = tempfile.mkdtemp(prefix="bench_vapi_")
+    previous_cwd = os.getcwd()
+    n8n_stub = N8nStub(latency_ms=args.n8n_latency_ms)
+    with n8n_stub:
+        # voice_vapi reads its configuration and opens ./chroma_db at import time
+        os.chdir(workdir)
+        os.environ.update({
+            "EMBEDDING_PROVIDER": "hashing",
+            "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.db"),
+            "CHROMA_DB_LISTINGS": BENCH_COLLECTION,
+            "N8N_WEBHOOK_URL": n8n_stub.url,
+            "AGENT_TIMEZONE": "America/Chicago",
+            # Never called: every run goes through the scripted model override
+            "OPENAI_LLM_MODEL": "test",
+            "SESSION_MAX_ENTRIES": str(max(args.stages) * args.sessions_per_worker * 2),
+            "LISTING_SEARCH_BACKEND": args.search_backend,
+        })
+        os.environ.pop("EMBEDDING_MODEL", None)
+        os.environ.pop("LEXICAL_INDEX_PATH", None)
+        os.environ.pop("GEO_INDEX_PATH", None)
+        os.environ.pop("LISTING_INDEX_PATH", None)
+        from utils.embedding_providers import get_embedding_provider
+
+        provider = get_embedding_provider()
+        embeddings, documents = await embed_listings(provider, listings)
+        _, collection, _ = build_temp_collection(listings, embeddings, documents, metadata=provider.collection_tags(),
+                                                 path=os.path.join(workdir, "chroma_db"))
+        # Picked up from ./lexical_index and ./geo_index like a real deployment after ingest
+        from utils.geo_index import GeoIndex
+        from utils.lexical_index import LexicalIndex
+        LexicalIndex.from_chroma_collection(collection).save(os.path.join(workdir, "lexical_index"))
+        GeoIndex.from_chroma_collection(collection).save(os.path.join(workdir, "geo_index"))
+
+        # Server-side logging (including logfire's console exporter, which keeps
+        # a handle on stdout from import time) goes to devnull for the whole run
+        devnull = open(os.devnull, "w")
+        with contextlib.redirect_stdout(devnull):
+            import voice_vapi
+
+        config = uvicorn.Config(voice_vapi.app, host="127.0.0.1", port=0, log_level="warning")
+        server = uvicorn.Server(config)
+        serve = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        results = []
+        limits = httpx.Limits(max_connections=max(args.stages), max_keepalive_connections=max(args.stages))
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60.0) as client:
+                with voice_vapi.realtor_agent.override(model=build_scripted_model(args.model_latency_ms)):
+                    print(f"{'conc':>5} {'sessions':>8} {'turns/s':>9} {'ttfb p50':>9} {'turn p50':>9} {'turn p95':>9} "
+                          f"{'turn p99':>9} {'lag p99':>9} {'lag max':>9} {'KiB/sess':>10} {'hist B':>9} {'errors':>6}")
+                    # One untimed call so first-use costs (dateparser, Chroma) don't land in stage 1
+                    with contextlib.redirect_stdout(devnull):
+                        await run_stage(client, voice_vapi, 1, 1, listings, stage=-1)
+                    for stage, concurrency in enumerate(args.stages):
+                        with contextlib.redirect_stdout(devnull):
+                            result = await run_stage(client, voice_vapi, concurrency, args.sessions_per_worker, listings, stage)
+                        print_stage(result)
+                        results.append(result)
+        finally:
+            server.should_exit = True
+            await serve
+            devnull.close()
+            os.chdir(previous_cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent multi-turn load test for the VAPI endpoint.")
+    parser.add_argument("--stages", type=int, nargs="+", default=DEFAULT_STAGES,
+                        help="concurrent calls per stage, run in order")
+    parser.add_argument("--sessions-per-worker", type=int, default=DEFAULT_SESSIONS_PER_WORKER,
+                        help="calls each concurrent worker places back to back")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0,
+                        help="simulated LLM latency added to every model response")
+    parser.add_argument("--n8n-latency-ms", type=float, default=0.0,
+                        help="simulated latency of the n8n webhook")
+    parser.add_argument("--search-backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--output", help="write stage results as JSON to this path")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "stages": results}, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
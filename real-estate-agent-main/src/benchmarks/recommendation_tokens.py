@@ -0,0 +1,106 @@
+# Prompt tokens per recommendation: full PropertyRecommendation payloads vs.
+# the compact PropertySummary projection recommend_properties returns by default.
+#
+# Runs the real tool against the sample listings (hashing embeddings, temporary
+# Chroma store) for a spread of profiles and sizes each tool return the way it
+# is sent back to the model. Also sizes the schedule_appointment arguments the
+# model writes: a whole property before, a listing_id now.
+#
+# Run from src/:
+#     python -m benchmarks.recommendation_tokens
+
+# Standard library imports
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import replace
+
+# Must be set before the embedding modules read them
+os.environ["EMBEDDING_PROVIDER"] = "hashing"
+os.environ.pop("EMBEDDING_MODEL", None)
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_cache_"), "embedding_cache.db")
+
+# Third-party library imports
+import numpy as np
+from pydantic_ai.messages import ToolReturnPart
+
+# Local application imports
+from agent.agent_config import AgentDependencies
+from agent.realtor_agent import realtor_agent  # noqa: F401 (registers the tools)
+from agent.tools.recommend_properties import recommend_properties
+from benchmarks.bench_tools import sample_profiles, with_saved_profile
+from benchmarks.fixtures import BENCH_COLLECTION, build_temp_collection, embed_listings, load_listings
+from models.agent_schedule_config import AgentScheduleConfig
+from utils.embedding_providers import get_embedding_provider
+from utils.history_compaction import estimate_tokens
+from utils.lexical_index import LexicalIndex
+
+DEFAULT_PROFILES = 50
+
+
+def item_tokens(recommendations: list) -> list[int]:
+    """Tokens each recommendation adds to a tool return, as the model sees it."""
+    return [
+        estimate_tokens(ToolReturnPart("recommend_properties", [item], tool_call_id="bench").model_response_str())
+        for item in recommendations
+    ]
+
+
+def booking_args_tokens(recommendation) -> tuple[int, int]:
+    selected = "tomorrow at 3pm"
+    full = json.dumps({"property": recommendation.model_dump(), "selected_date_time": selected})
+    compact = json.dumps({"listing_id": recommendation.listing_id, "selected_date_time": selected})
+    return estimate_tokens(full), estimate_tokens(compact)
+
+
+async def run(profile_count: int) -> dict:
+    listings = load_listings()
+    provider = get_embedding_provider()
+    embeddings, documents = await embed_listings(provider, listings)
+    client, collection, path = build_temp_collection(listings, embeddings, documents, metadata=provider.collection_tags())
+
+    try:
+        deps = AgentDependencies(
+            chroma_client=client,
+            chroma_db_listings=BENCH_COLLECTION,
+            n8n_webhook_url="",
+            agent_schedule_config=AgentScheduleConfig(timezone="America/Chicago"),
+            lexical_index=LexicalIndex.from_chroma_collection(collection),
+        )
+        tokens = {"full": [], "compact": []}
+        booking = {"full": [], "compact": []}
+        for profile in sample_profiles(listings, profile_count):
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                full = await recommend_properties(with_saved_profile(replace(deps, compact_recommendations=False), profile))
+                compact = await recommend_properties(with_saved_profile(deps, profile))
+            tokens["full"] += item_tokens(full)
+            tokens["compact"] += item_tokens(compact)
+            for recommendation in full:
+                full_args, compact_args = booking_args_tokens(recommendation)
+                booking["full"].append(full_args)
+                booking["compact"].append(compact_args)
+        return {"recommendation": tokens, "schedule_appointment args": booking}
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report prompt tokens per recommendation, full vs. compact.")
+    parser.add_argument("--profiles", type=int, default=DEFAULT_PROFILES)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.profiles))
+    print(f"{'payload':<26} {'items':>6} {'full mean':>10} {'full p95':>9} {'compact mean':>13} {'compact p95':>12} {'reduction':>10}")
+    for name, tokens in results.items():
+        full, compact = np.asarray(tokens["full"]), np.asarray(tokens["compact"])
+        reduction = 1 - compact.mean() / full.mean()
+        print(f"{name:<26} {len(full):>6} {full.mean():>10.1f} {np.percentile(full, 95):>9.1f} "
+              f"{compact.mean():>13.1f} {np.percentile(compact, 95):>12.1f} {reduction * 100:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# Replays recorded caller transcripts through realtor_agent with the scripted
+# stand-in model and checks each conversation against a stored budget.
+#
+# Requests and tool calls are deterministic, and request/response tokens come
+# from FunctionModel's estimate (which includes the system prompt), so a
+# SYSTEM_PROMPT or tool change that makes calls longer or chattier fails here.
+#
+# Run from src/:
+#     python -m benchmarks.replay_transcripts
+#     python -m benchmarks.replay_transcripts --update-baseline
+
+# Standard library imports
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+# Must be set before the embedding modules read them
+os.environ["EMBEDDING_PROVIDER"] = "hashing"
+os.environ.pop("EMBEDDING_MODEL", None)
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_cache_"), "embedding_cache.db")
+
+# Third-party library imports
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+from pydantic_ai.usage import Usage
+
+# Local application imports
+from agent.agent_config import AgentDependencies
+from agent.realtor_agent import realtor_agent
+from benchmarks.fixtures import BENCH_COLLECTION, N8nStub, build_temp_collection, embed_listings, load_listings
+from benchmarks.scripted_model import build_scripted_model, profile_message
+from models.agent_schedule_config import AgentScheduleConfig
+from models.user_profile import UserProfile
+from utils.embedding_providers import get_embedding_provider
+from utils.geo_index import GeoIndex
+from utils.history_compaction import HISTORY_TOKEN_BUDGET, compact_message_history
+from utils.lexical_index import LexicalIndex
+from utils.listing_table import LiveListingTable
+
+TRANSCRIPTS_DIR = os.path.join(os.path.dirname(__file__), "transcripts")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "replay_baseline.json")
+
+# Counted metrics must not grow at all; tokens get a little slack for
+# date-dependent tool output, wall time a lot for machine noise
+EXACT_METRICS = ["requests", "tool_calls"]
+DEFAULT_TOKEN_TOLERANCE = 0.02
+DEFAULT_WALL_TOLERANCE = 1.0
+WALL_SLACK_MS = 250
+
+
+def load_transcripts(pattern: str = "*") -> dict[str, list[str]]:
+    transcripts = {}
+    for path in sorted(glob.glob(os.path.join(TRANSCRIPTS_DIR, f"{pattern}.json"))):
+        with open(path, "r") as f:
+            turns = json.load(f)["turns"]
+        name = os.path.splitext(os.path.basename(path))[0]
+        transcripts[name] = [
+            turn if isinstance(turn, str) else profile_message(turn["say"], turn["profile"])
+            for turn in turns
+        ]
+    return transcripts
+
+
+def count_tool_calls(messages: list[ModelMessage]) -> int:
+    return sum(
+        isinstance(part, ToolCallPart)
+        for message in messages if isinstance(message, ModelResponse)
+        for part in message.parts
+    )
+
+
+async def replay(turns: list[str], deps: AgentDependencies, token_budget: int) -> dict:
+    model = build_scripted_model()
+    usage = Usage()
+    message_history: list[ModelMessage] = []
+    tool_calls = 0
+
+    start = time.perf_counter()
+    for text in turns:
+        # Same per-turn flow as voice_vapi: compact, run, keep the full history
+        message_history, _ = compact_message_history(
+            message_history,
+            token_budget,
+            profile_facts=deps.profile.model_dump(exclude_defaults=True)
+        )
+        result = await realtor_agent.run(
+            text,
+            model=model,
+            deps=deps,
+            message_history=message_history,
+            usage=usage
+        )
+        tool_calls += count_tool_calls(result.new_messages())
+        message_history = result.all_messages()
+
+    return {
+        "turns": len(turns),
+        "requests": usage.requests,
+        "tool_calls": tool_calls,
+        "request_tokens": usage.request_tokens or 0,
+        "response_tokens": usage.response_tokens or 0,
+        "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def check_budget(name: str, result: dict, budget: dict, token_tolerance: float, wall_tolerance: float) -> list[str]:
+    """Return human-readable budget violations for one conversation."""
+    limits = {metric: budget[metric] for metric in EXACT_METRICS}
+    for metric in ("request_tokens", "response_tokens"):
+        limits[metric] = int(budget[metric] * (1 + token_tolerance))
+    # Absolute slack so short conversations don't fail on scheduler jitter
+    limits["wall_ms"] = budget["wall_ms"] * (1 + wall_tolerance) + WALL_SLACK_MS
+
+    return [
+        f"{name}: {metric} {result[metric]} exceeds budget {limit:g} (baseline {budget[metric]})"
+        for metric, limit in limits.items()
+        if result[metric] > limit
+    ]
+
+
+async def run(pattern: str, token_budget: int) -> dict:
+    transcripts = load_transcripts(pattern)
+    if not transcripts:
+        raise SystemExit(f"no transcripts match {pattern!r} in {TRANSCRIPTS_DIR}")
+
+    listings = load_listings()
+    provider = get_embedding_provider()
+    embeddings, documents = await embed_listings(provider, listings)
+    client, collection, path = build_temp_collection(listings, embeddings, documents, metadata=provider.collection_tags())
+
+    try:
+        with N8nStub() as n8n_stub:
+            deps = AgentDependencies(
+                chroma_client=client,
+                chroma_db_listings=BENCH_COLLECTION,
+                n8n_webhook_url=n8n_stub.url,
+                agent_schedule_config=AgentScheduleConfig(timezone="America/Chicago"),
+                lexical_index=LexicalIndex.from_chroma_collection(collection),
+                geo_index=GeoIndex.from_chroma_collection(collection),
+                listing_table=LiveListingTable(client, BENCH_COLLECTION),
+            )
+            deps.listing_table.load()
+            results = {}
+            for name, turns in transcripts.items():
+                # Tools log every call; keep the replay output readable
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    # Each conversation starts with an empty saved profile
+                    results[name] = await replay(turns, replace(deps, profile=UserProfile()), token_budget)
+            return results
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay caller transcripts and enforce request/token budgets.")
+    parser.add_argument("--transcripts", default="*", help="glob of transcript names to replay")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="record the current results as the new budgets")
+    parser.add_argument("--history-token-budget", type=int, default=HISTORY_TOKEN_BUDGET)
+    parser.add_argument("--token-tolerance", type=float, default=DEFAULT_TOKEN_TOLERANCE)
+    parser.add_argument("--wall-tolerance", type=float, default=DEFAULT_WALL_TOLERANCE)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.transcripts, args.history_token_budget))
+
+    print(f"{'transcript':<16} {'turns':>5} {'requests':>8} {'tools':>5} {'req tok':>8} {'resp tok':>8} {'wall ms':>9}")
+    for name, result in results.items():
+        print(f"{name:<16} {result['turns']:>5} {result['requests']:>8} {result['tool_calls']:>5} "
+              f"{result['request_tokens']:>8} {result['response_tokens']:>8} {result['wall_ms']:>9}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nupdated {args.baseline}")
+        return
+
+    violations = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"\n{name}: no baseline yet, run with --update-baseline to record one")
+            continue
+        violations += check_budget(name, result, baseline[name], args.token_tolerance, args.wall_tolerance)
+
+    if violations:
+        print("\nbudget exceeded:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\nall transcripts within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Deterministic stand-in for the LLM, driving the real tools offline.
+#
+# The caller's script embeds profile details in a message as "PROFILE {json}";
+# the model passes them to recommend_properties as `changes`. Otherwise it
+# picks a tool from keywords in the latest user message, and answers with a
+# canned line once the tool has returned. Tools that act on a listing get the
+# listing_id of the first recommendation.
+
+# Standard library imports
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Optional
+
+# Third-party library imports
+from pydantic import BaseModel
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+PROFILE_MARKER = "PROFILE "
+DEFAULT_PREFERENCE = "tomorrow afternoon"
+DEFAULT_BOOKING_TIME = "tomorrow at 3pm"
+# Date/time phrases passed through to the tools verbatim, e.g. "friday at 2pm"
+WHEN_PATTERN = re.compile(
+    r"\b(today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+    r"(\s+(morning|afternoon|evening))?(\s+at\s+\d{1,2}(:\d{2})?\s*(am|pm))?",
+    re.IGNORECASE,
+)
+
+
+def profile_message(text: str, profile: dict) -> str:
+    return f"{text} {PROFILE_MARKER}{json.dumps(profile)}"
+
+
+def latest_user_prompt(messages: list[ModelMessage]) -> str:
+    for message in reversed(messages):
+        if isinstance(message, ModelRequest):
+            for part in message.parts:
+                if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                    return part.content
+    return ""
+
+
+def latest_tool_return(messages: list[ModelMessage], tool_name: str):
+    for message in reversed(messages):
+        if isinstance(message, ModelRequest):
+            for part in message.parts:
+                if isinstance(part, ToolReturnPart) and part.tool_name == tool_name:
+                    return part.content
+    return None
+
+
+def when_phrase(prompt: str, default: str) -> str:
+    match = WHEN_PATTERN.search(prompt)
+    return match.group(0) if match else default
+
+
+def first_recommendation(messages: list[ModelMessage]) -> Optional[dict]:
+    recommendations = latest_tool_return(messages, "recommend_properties")
+    if isinstance(recommendations, list) and recommendations and isinstance(recommendations[0], (BaseModel, dict)):
+        item = recommendations[0]
+        return item.model_dump() if isinstance(item, BaseModel) else item
+    return None
+
+
+def plan_response(messages: list[ModelMessage]) -> tuple[str, object]:
+    """Return ("text", str) or ("tools", [(name, args), ...]) for the next model response."""
+    last = messages[-1]
+    if isinstance(last, ModelRequest) and any(isinstance(p, ToolReturnPart) for p in last.parts):
+        # With parallel calls, the last return is the one worth talking about
+        tool_return = [p for p in last.parts if isinstance(p, ToolReturnPart)][-1]
+        if tool_return.tool_name == "recommend_properties":
+            item = first_recommendation(messages)
+            if item is None:
+                return "text", "I couldn't find a match yet. Could you tell me a bit more?"
+            return "text", f"I found a {item['bedrooms']} bedroom home at {item['address']} for ${item['price']:,}. Would you like to see it?"
+        if tool_return.tool_name == "get_agent_availability":
+            return "text", "I have a few openings tomorrow afternoon. Which time works for you?"
+        if tool_return.tool_name == "get_property_details" and isinstance(tool_return.content, BaseModel):
+            details = tool_return.content
+            return "text", f"It was built in {details.year_built} and sits on a {details.lot_size} acre lot. Would you like to see it?"
+        return "text", "You're all set. Is there anything else I can help with?"
+
+    prompt = latest_user_prompt(messages)
+    lowered = prompt.lower()
+    if PROFILE_MARKER in prompt:
+        changes = json.loads(prompt.split(PROFILE_MARKER, 1)[1])
+        # Save and search in one response: the new fields go to
+        # recommend_properties itself, as SYSTEM_PROMPT asks
+        return "tools", [("recommend_properties", {"changes": changes})]
+    item = first_recommendation(messages)
+    if item is not None and "book" in lowered:
+        return "tools", [("schedule_appointment", {
+            "listing_id": item["listing_id"],
+            "selected_date_time": when_phrase(prompt, DEFAULT_BOOKING_TIME),
+        })]
+    if item is not None and "more about" in lowered:
+        return "tools", [("get_property_details", {"listing_id": item["listing_id"]})]
+    if item is not None and ("see it" in lowered or "available" in lowered):
+        return "tools", [("get_agent_availability", {"date_time_preference": when_phrase(prompt, DEFAULT_PREFERENCE)})]
+    return "text", "Hi! I'd be happy to help. Are you looking to buy or rent?"
+
+
+def build_scripted_model(latency_ms: float = 0.0, chunk_words: int = 3) -> FunctionModel:
+    """FunctionModel following `plan_response`; `latency_ms` delays each response."""
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        kind, payload = plan_response(messages)
+        if kind == "tools":
+            return ModelResponse(parts=[ToolCallPart(name, args) for name, args in payload])
+        return ModelResponse(parts=[TextPart(payload)])
+
+    async def stream_respond(messages: list[ModelMessage], info: AgentInfo) -> AsyncIterator:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        kind, payload = plan_response(messages)
+        if kind == "tools":
+            yield {i: DeltaToolCall(name=name, json_args=json.dumps(args)) for i, (name, args) in enumerate(payload)}
+            return
+        words = payload.split(" ")
+        for i in range(0, len(words), chunk_words):
+            yield " ".join(words[i:i + chunk_words]) + (" " if i + chunk_words < len(words) else "")
+
+    return FunctionModel(respond, stream_function=stream_respond, model_name="scripted")
@@ -15,6 +15,14 @@ from agent.realtor_agent import realtor_agent
 from agent.agent_config import AgentDependencies
 from models.agent_schedule_config import AgentScheduleConfig
 from agent.agent_cost import compute_cost
+from utils.embedding_cache import get_embedding_cache
+from utils.embedding_providers import check_embedding_tags, get_embedding_provider
+from utils.geo_index import GeoIndex
+from utils.lexical_index import LexicalIndex
+from utils.listing_index import ListingIndex
+from utils.listing_table import LiveListingTable
+from utils.history_compaction import compact_message_history
+from utils.n8n_client import close_n8n_client
 
 logfire.configure(send_to_logfire='if-token-present')
 
@@ -24,17 +32,56 @@ async def main():
     chroma_db_listings = os.getenv("CHROMA_DB_LISTINGS")
     n8n_webhook_url = os.getenv("N8N_WEBHOOK_URL")
     agent_timezone = os.getenv("AGENT_TIMEZONE")
+    history_token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", 6000))
+    listing_search_backend = os.getenv("LISTING_SEARCH_BACKEND", "chroma")
+    listing_index_path = os.getenv("LISTING_INDEX_PATH")
+    lexical_index_path = os.getenv("LEXICAL_INDEX_PATH", "lexical_index")
+    geo_index_path = os.getenv("GEO_INDEX_PATH", "geo_index")
+    compact_recommendations = os.getenv("COMPACT_RECOMMENDATIONS", "true").lower() == "true"
+    listing_table_enabled = os.getenv("LISTING_TABLE", "false").lower() == "true"
     agent_schedule_config = AgentScheduleConfig(
         timezone=agent_timezone
     ) 
 
     # Initialize agent and user profile
     agent = realtor_agent
+    chroma_client = chromadb.PersistentClient(path="chroma_db")
+    listing_index = None
+    if listing_index_path:
+        listing_index = ListingIndex.load(listing_index_path)
+    elif listing_search_backend == "numpy":
+        listing_index = ListingIndex.from_chroma_collection(chroma_client.get_collection(chroma_db_listings))
+
+    # Query vectors must come from the same embedding space the listings were ingested with
+    embedding_provider = get_embedding_provider()
+    if listing_index is not None:
+        check_embedding_tags(listing_index.embedding, embedding_provider, "Listing index")
+    else:
+        listing_collection = chroma_client.get_collection(chroma_db_listings)
+        check_embedding_tags(listing_collection.metadata, embedding_provider, f"Collection '{chroma_db_listings}'")
+
+    # Opt-in, Chroma backend only; kept in step with the collection revision
+    listing_table = None
+    if listing_table_enabled and listing_index is None:
+        listing_table = LiveListingTable(chroma_client, chroma_db_listings)
+        listing_table.load()
+
+    lexical_index = LexicalIndex.load(lexical_index_path) if os.path.exists(lexical_index_path) else None
+    if listing_index is not None:
+        geo_index = listing_index.geo
+    else:
+        geo_index = GeoIndex.load(geo_index_path) if os.path.exists(geo_index_path) else None
+
     agent_deps = AgentDependencies(
-        chroma_client=chromadb.PersistentClient(path="chroma_db"),
+        chroma_client=chroma_client,
         chroma_db_listings=chroma_db_listings,
         n8n_webhook_url=n8n_webhook_url,
-        agent_schedule_config=agent_schedule_config
+        agent_schedule_config=agent_schedule_config,
+        listing_index=listing_index,
+        listing_table=listing_table,
+        lexical_index=lexical_index,
+        geo_index=geo_index,
+        compact_recommendations=compact_recommendations
     )
 
     print("Welcome to the Real Estate Agent Chat!")
@@ -50,6 +97,14 @@ async def main():
             print("Goodbye!")
             break
 
+        message_history, compaction = compact_message_history(
+            message_history,
+            history_token_budget,
+            profile_facts=agent_deps.profile.model_dump(exclude_defaults=True)
+        )
+        if compaction.tokens_saved:
+            print(f"history compaction: {compaction.tokens_before} -> {compaction.tokens_after} tokens (saved {compaction.tokens_saved})")
+
         response = await agent.run(
             message, 
             deps=agent_deps,
@@ -64,9 +119,12 @@ async def main():
         # Prompt next input
         message = input("You: ")
 
+    await close_n8n_client()
+
     prompt_cost, completion_cost, total_cost = await compute_cost(usage=agent_usage)
     print(f"prompt_cost: {prompt_cost}, completion_cost: {completion_cost}, total_cost: {total_cost}")
     print(f"request_tokens: {agent_usage.request_tokens}, response_tokens: {agent_usage.response_tokens}, total_tokens: {agent_usage.total_tokens}, requests: {agent_usage.requests}")
+    print(f"embedding cache: {get_embedding_cache().stats()}")
     
 
 
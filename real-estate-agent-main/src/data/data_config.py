@@ -1,3 +1,7 @@
 CHROMA_DB_PATH = "../../chroma_db"
 CHROMA_DB_LISTINGS = "real_estate_listings"
-LISTINGS_DATASET = "chicago_listings_1000.json"
\ No newline at end of file
+LISTINGS_DATASET = "chicago_listings_1000.json"
+LISTING_INDEX_PATH = "../../listing_index"
+LEXICAL_INDEX_PATH = "../../lexical_index"
+GEO_INDEX_PATH = "../../geo_index"
+INGEST_CHECKPOINT_PATH = "../../.ingest_checkpoint.jsonl"
\ No newline at end of file
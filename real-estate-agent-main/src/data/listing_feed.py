@@ -0,0 +1,135 @@
+import json
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO
+
+READ_CHUNK_SIZE = 1 << 16
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+MAX_REPORTED_INVALID_ROWS = 10
+
+# Every field the recommendation model reads back out of the metadata
+LISTING_SCHEMA = {
+    "listing_id": str,
+    "address": str,
+    "city": str,
+    "state": str,
+    "zip_code": str,
+    "neighborhood": str,
+    "latitude": (int, float),
+    "longitude": (int, float),
+    "price": int,
+    "property_type": str,
+    "bedrooms": int,
+    "bathrooms": (int, float),
+    "square_feet": int,
+    "lot_size": (int, float),
+    "year_built": int,
+    "days_on_market": int,
+    "description": str,
+    "mls_status": str,
+}
+
+
+def iter_json_array(f: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the elements of a top-level JSON array without loading the whole file.
+
+    Only a read chunk plus the element currently being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Listing feed is not a JSON array")
+    pos = 1
+
+    while True:
+        # Skip whitespace and separators, refilling the buffer as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer):
+                break
+            buffer, pos = f.read(chunk_size), 0
+            if not buffer:
+                raise ValueError("Listing feed ended before the closing ']'")
+
+        if buffer[pos] == "]":
+            return
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer, pos = buffer[pos:] + chunk, 0
+        yield item
+        pos = end
+
+
+def iter_json_lines(f: TextIO) -> Iterator[dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_listing_rows(f: TextIO, path: str, feed_format: str = "auto") -> Iterator[dict]:
+    """Rows from a JSON array or JSON Lines feed; "auto" picks by file extension."""
+    if feed_format == "auto":
+        feed_format = "jsonl" if path.endswith(JSON_LINES_SUFFIXES) else "json"
+    if feed_format == "jsonl":
+        return iter_json_lines(f)
+    return iter_json_array(f)
+
+
+def validate_listing(row) -> Optional[str]:
+    """Return why `row` can't be ingested, or None if it's valid."""
+    if not isinstance(row, dict):
+        return f"expected an object, got {type(row).__name__}"
+    for field, expected_type in LISTING_SCHEMA.items():
+        value = row.get(field)
+        if value is None:
+            return f"missing {field}"
+        # bool is an int subclass but never a valid number here
+        if isinstance(value, bool) or not isinstance(value, expected_type):
+            return f"{field} has type {type(value).__name__}"
+    return None
+
+
+class FeedStats:
+    def __init__(self, track_ids: bool = False):
+        self.rows = 0
+        self.invalid = 0
+        # With `track_ids`, the listing_id of every row, valid or not, and how
+        # many rows had none; held in memory, so off for streamed feeds
+        self.listing_ids: Optional[set] = set() if track_ids else None
+        self.unidentified = 0
+
+    def __str__(self) -> str:
+        return f"{self.rows} rows read, {self.invalid} invalid"
+
+
+def valid_listings(rows: Iterable, stats: FeedStats) -> Iterator[dict]:
+    for row in rows:
+        stats.rows += 1
+        if stats.listing_ids is not None:
+            listing_id = row.get("listing_id") if isinstance(row, dict) else None
+            if isinstance(listing_id, str) and listing_id:
+                stats.listing_ids.add(listing_id)
+            else:
+                stats.unidentified += 1
+        error = validate_listing(row)
+        if error is None:
+            yield row
+            continue
+        stats.invalid += 1
+        if stats.invalid <= MAX_REPORTED_INVALID_ROWS:
+            listing_id = row.get("listing_id") if isinstance(row, dict) else None
+            print(f"⚠️ Skipping row {stats.rows} ({listing_id or 'no listing_id'}): {error}")
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -1,11 +1,37 @@
+import argparse
+import asyncio
+import hashlib
 import json
+import random
+import time
 import openai
 import chromadb
-from time import sleep
+from chromadb.errors import InvalidCollectionException
+import sys
+from pathlib import Path
+from typing import Iterable, Optional
 
 from dotenv import load_dotenv
 import os
-from data_config import CHROMA_DB_LISTINGS, CHROMA_DB_PATH, LISTINGS_DATASET
+from data_config import (
+    CHROMA_DB_LISTINGS,
+    CHROMA_DB_PATH,
+    GEO_INDEX_PATH,
+    INGEST_CHECKPOINT_PATH,
+    LEXICAL_INDEX_PATH,
+    LISTINGS_DATASET,
+    LISTING_INDEX_PATH,
+)
+from listing_feed import FeedStats, batched, iter_listing_rows, valid_listings
+
+# Make src/ importable so the shared index code in utils/ can be reused
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from utils.amenities import AMENITY_VOCABULARY_VERSION, amenity_metadata
+from utils.embedding_providers import EmbeddingProvider, check_embedding_tags, embedding_model_from_env, make_embedding_provider
+from utils.geo_index import GeoIndex
+from utils.lexical_index import LexicalIndex
+from utils.listing_index import ListingIndex
+from utils.listing_table import stamp_listing_revision
 
 load_dotenv()
 
@@ -42,41 +68,393 @@ def generate_property_text(property_data: dict) -> str:
 
     return ' '.join(parts)
 
-# OpenAI embedding function
-def get_openai_embeddings(texts: list[str]) -> list[list[float]]:
-    response = openai.embeddings.create(
-        input=texts,
-        model="text-embedding-3-small"
-    )
-    return [item.embedding for item in response.data]
+BATCH_SIZE = 100
+EMBED_CONCURRENCY = 4
+EMBED_REQUESTS_PER_MINUTE = 300
+EMBED_MAX_RETRIES = 6
+EMBED_BACKOFF_BASE_SECONDS = 2.0
+EMBED_BACKOFF_MAX_SECONDS = 60.0
+CHROMA_PAGE_SIZE = 5000
+STREAM_PROGRESS_EVERY_BATCHES = 10
 
-# Load listings
-with open(LISTINGS_DATASET, "r") as f:
-    listings = json.load(f)
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)
 
-# Init Chroma
-client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
-collection = client.get_or_create_collection(CHROMA_DB_LISTINGS)
 
-# Batch insert
-BATCH_SIZE = 100
-for i in range(0, len(listings), BATCH_SIZE):
-    batch = listings[i:i + BATCH_SIZE]
-    documents = [generate_property_text(item) for item in batch]
-    ids = [item["listing_id"] for item in batch]
-    metadatas = [{k: v for k, v in item.items()} for item in batch]
+def content_hash(document: str) -> str:
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
 
-    try:
-        embeddings = get_openai_embeddings(documents)
-    except openai.RateLimitError:
-        print("⚠️ Rate limit hit. Waiting and retrying...")
-        sleep(20)
-        embeddings = get_openai_embeddings(documents)
 
-    collection.add(
+class RateLimiter:
+    """Spaces out request starts so at most `per_minute` begin in any minute."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Embedding function with exponential backoff on rate limits and transient errors
+async def get_embeddings(provider: EmbeddingProvider, texts: list[str], rate_limiter: RateLimiter) -> list[list[float]]:
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        await rate_limiter.wait()
+        try:
+            return await provider.embed_batch(texts)
+        except RETRYABLE_ERRORS as e:
+            if attempt == EMBED_MAX_RETRIES:
+                raise
+            delay = random.uniform(0, min(EMBED_BACKOFF_MAX_SECONDS, EMBED_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            print(f"⚠️ {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{EMBED_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+
+
+def fetch_existing_hashes(collection) -> dict[str, str]:
+    """listing_id -> content_hash for everything already in the collection."""
+    existing = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=CHROMA_PAGE_SIZE, offset=offset)
+        for listing_id, metadata in zip(page["ids"], page["metadatas"]):
+            existing[listing_id] = (metadata or {}).get("content_hash")
+        if len(page["ids"]) < CHROMA_PAGE_SIZE:
+            return existing
+        offset += CHROMA_PAGE_SIZE
+
+
+class IngestCheckpoint:
+    """Listings upserted so far in an interrupted run, appended to a JSON Lines log after every batch.
+
+    Each line maps the ids of one batch to their content hashes, so a batch
+    costs one small append instead of rewriting everything done so far. A
+    resumed run compacts the log into a single line; a torn last line from a
+    crash is ignored, and those listings are simply upserted again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed: dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        self.completed.update(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+            self.compact()
+            print(f"↩️ Resuming: {len(self.completed)} listings already upserted by a previous run")
+
+    def mark(self, ids: list[str], hashes: list[str]):
+        batch = dict(zip(ids, hashes))
+        self.completed.update(batch)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(batch) + "\n")
+
+    def compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(self.completed) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def prepare_listing(item: dict) -> tuple[dict, str, str]:
+    """Return (metadata, document, hash); metadata is the listing plus its amenity index fields."""
+    document = generate_property_text(item)
+    amenities = amenity_metadata(item["description"])
+    # Hash the extracted amenities too, so a vocabulary change re-indexes affected listings
+    item_hash = content_hash(f"{document}\namenities:v{AMENITY_VOCABULARY_VERSION}:{amenities['amenities']}")
+    return {**item, **amenities}, document, item_hash
+
+
+async def embed_and_upsert(collection, provider: EmbeddingProvider, rate_limiter: RateLimiter, batch: list[tuple]):
+    documents = [document for _, document, _ in batch]
+    embeddings = await get_embeddings(provider, documents, rate_limiter)
+    collection.upsert(
         documents=documents,
-        metadatas=metadatas,
-        ids=ids,
+        metadatas=[{**item, "content_hash": item_hash} for item, _, item_hash in batch],
+        ids=[item["listing_id"] for item, _, _ in batch],
         embeddings=embeddings
     )
-    print(f"✅ Inserted {i + len(batch)} of {len(listings)} listings.")
+
+
+async def ingest_listings(
+        collection,
+        listings: list[dict],
+        provider: EmbeddingProvider,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY,
+        requests_per_minute: int = EMBED_REQUESTS_PER_MINUTE,
+        full: bool = False,
+        checkpoint_path: str = INGEST_CHECKPOINT_PATH,
+        feed_ids: Optional[set] = None):
+    """Upsert new or changed listings and delete stored ones missing from `feed_ids`.
+
+    `feed_ids` should hold every listing_id in the raw feed, including rows
+    that failed validation, so a listing whose feed row is broken is kept
+    rather than deleted. Defaults to the ids of `listings`; pass an empty set
+    to skip pruning.
+    """
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    # Always loaded: pruning needs every stored id, even on a full rebuild
+    existing = {**fetch_existing_hashes(collection), **checkpoint.completed}
+    # A full rebuild ignores stored hashes but still skips what this run already upserted
+    skip_hashes = checkpoint.completed if full else existing
+
+    # Only new or changed listings get re-embedded
+    pending = []
+    for item in listings:
+        record = prepare_listing(item)
+        if skip_hashes.get(item["listing_id"]) != record[2]:
+            pending.append(record)
+
+    if feed_ids is None:
+        feed_ids = {item["listing_id"] for item in listings}
+    stale_ids = [] if not feed_ids else [listing_id for listing_id in existing if listing_id not in feed_ids]
+    print(f"📋 {len(listings)} listings in feed: {len(pending)} new/changed, {len(listings) - len(pending)} unchanged, {len(stale_ids)} removed")
+
+    rate_limiter = RateLimiter(requests_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    upserted = 0
+
+    async def process_batch(batch):
+        nonlocal upserted
+        async with semaphore:
+            await embed_and_upsert(collection, provider, rate_limiter, batch)
+        checkpoint.mark([item["listing_id"] for item, _, _ in batch], [item_hash for _, _, item_hash in batch])
+        upserted += len(batch)
+        print(f"✅ Upserted {upserted} of {len(pending)} new/changed listings.")
+
+    await asyncio.gather(*(
+        process_batch(pending[i:i + batch_size])
+        for i in range(0, len(pending), batch_size)
+    ))
+
+    for i in range(0, len(stale_ids), CHROMA_PAGE_SIZE):
+        collection.delete(ids=stale_ids[i:i + CHROMA_PAGE_SIZE])
+    if stale_ids:
+        print(f"🗑️ Deleted {len(stale_ids)} listings no longer in the feed.")
+
+    checkpoint.clear()
+
+
+async def stream_ingest_listings(
+        collection,
+        rows: Iterable[dict],
+        provider: EmbeddingProvider,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = EMBED_CONCURRENCY,
+        requests_per_minute: int = EMBED_REQUESTS_PER_MINUTE,
+        full: bool = False) -> dict:
+    """Ingest a feed of any size in bounded memory.
+
+    Rows flow through a generator pipeline (parse -> validate -> document) and
+    are written in batches, with at most `concurrency` batches in flight, so
+    memory depends on the batch size rather than the feed size. Content hashes
+    are checked per batch against the collection itself, which also makes an
+    interrupted run resumable without a checkpoint file. Listings missing from
+    the feed are not pruned, since that would require holding every feed id.
+    """
+    feed_stats = FeedStats()
+    records = (prepare_listing(item) for item in valid_listings(rows, feed_stats))
+
+    rate_limiter = RateLimiter(requests_per_minute)
+    upserted = unchanged = 0
+    started = time.perf_counter()
+
+    async def process_batch(batch):
+        nonlocal upserted, unchanged
+        if not full:
+            ids = [item["listing_id"] for item, _, _ in batch]
+            stored = collection.get(ids=ids, include=["metadatas"])
+            known = {
+                listing_id: (metadata or {}).get("content_hash")
+                for listing_id, metadata in zip(stored["ids"], stored["metadatas"])
+            }
+            changed = [record for record in batch if known.get(record[0]["listing_id"]) != record[2]]
+            unchanged += len(batch) - len(changed)
+            batch = changed
+        if batch:
+            await embed_and_upsert(collection, provider, rate_limiter, batch)
+            upserted += len(batch)
+
+    in_flight = set()
+    for batch_number, batch in enumerate(batched(records, batch_size), start=1):
+        in_flight.add(asyncio.create_task(process_batch(batch)))
+        if len(in_flight) >= concurrency:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        if batch_number % STREAM_PROGRESS_EVERY_BATCHES == 0:
+            elapsed = time.perf_counter() - started
+            print(f"⏩ {feed_stats}, {upserted} upserted, {unchanged} unchanged ({feed_stats.rows / elapsed:,.0f} rows/s)")
+    for task in asyncio.as_completed(in_flight):
+        await task
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "rows": feed_stats.rows,
+        "invalid": feed_stats.invalid,
+        "upserted": upserted,
+        "unchanged": unchanged,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(feed_stats.rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"✅ Streamed {feed_stats}: {upserted} upserted, {unchanged} unchanged "
+          f"in {summary['seconds']}s ({summary['rows_per_second']} rows/s, peak RSS {summary['peak_rss_mb']} MB)")
+    return summary
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def open_listing_collection(client, name: str, provider: EmbeddingProvider):
+    """Get or create the listing collection, tagged with the embedding provider.
+
+    Refuses to mix vectors from different providers, models or dimensions in
+    one collection.
+    """
+    try:
+        collection = client.get_collection(name)
+    except InvalidCollectionException:
+        return client.create_collection(name, metadata=provider.collection_tags())
+
+    metadata = collection.metadata or {}
+    if "embedding_provider" not in metadata and collection.count() == 0:
+        # An empty untagged collection can still be claimed by any provider. Chroma
+        # won't modify metadata that includes the distance space, so recreate it.
+        client.delete_collection(name)
+        return client.create_collection(name, metadata={**metadata, **provider.collection_tags()})
+
+    check_embedding_tags(metadata, provider, f"Collection '{name}'")
+    return collection
+
+
+# Export a memory-mappable index artifact from the collection
+def export_listing_index(collection, index_path: str):
+    index = ListingIndex.from_chroma_collection(collection)
+    manifest = index.save(index_path, source=collection.name)
+    print(f"📦 Exported {manifest['count']} listings ({manifest['dimension']}-d) to {index_path}")
+
+
+def build_lexical_index(collection, index_path: str):
+    start = time.perf_counter()
+    index = LexicalIndex.from_chroma_collection(collection, page_size=CHROMA_PAGE_SIZE)
+    index.save(index_path, source=collection.name)
+    print(f"🔤 Built lexical index over {len(index)} listings ({len(index.vocab)} terms) "
+          f"in {time.perf_counter() - start:.1f}s at {index_path}")
+
+
+def build_geo_index(collection, index_path: str):
+    start = time.perf_counter()
+    index = GeoIndex.from_chroma_collection(collection, page_size=CHROMA_PAGE_SIZE)
+    index.save(index_path, source=collection.name)
+    print(f"🗺️ Built geo index over {len(index)} listings ({len(index.centroids)} neighborhoods) "
+          f"in {time.perf_counter() - start:.1f}s at {index_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load listings into Chroma and optionally export a mmap index.")
+    parser.add_argument("--export-index", nargs="?", const=LISTING_INDEX_PATH, default=None,
+                        help=f"also write a memory-mappable index artifact (default path: {LISTING_INDEX_PATH})")
+    parser.add_argument("--skip-ingest", action="store_true",
+                        help="only export the index from the existing collection")
+    parser.add_argument("--lexical-index", default=LEXICAL_INDEX_PATH,
+                        help=f"where to write the BM25 index rebuilt after every ingest (default: {LEXICAL_INDEX_PATH})")
+    parser.add_argument("--geo-index", default=GEO_INDEX_PATH,
+                        help=f"where to write the spatial index rebuilt after every ingest (default: {GEO_INDEX_PATH})")
+    parser.add_argument("--feed", default=LISTINGS_DATASET,
+                        help="listing feed to ingest: a JSON array or JSON Lines file")
+    parser.add_argument("--feed-format", choices=["auto", "json", "jsonl"], default="auto",
+                        help="feed format (auto picks by extension: .jsonl/.ndjson are JSON Lines)")
+    parser.add_argument("--stream", action="store_true",
+                        help="ingest in bounded memory for very large feeds (does not prune removed listings)")
+    parser.add_argument("--embedding-provider", default=os.getenv("EMBEDDING_PROVIDER", "openai"),
+                        choices=["openai", "hashing", "sentence-transformers"])
+    parser.add_argument("--embedding-model", default=None,
+                        help="provider model name (dimension for the hashing provider); defaults to "
+                             "EMBEDDING_MODEL, or HASHING_EMBEDDING_DIMENSION for the hashing provider")
+    parser.add_argument("--full", action="store_true",
+                        help="re-embed every listing, ignoring content hashes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY,
+                        help="embedding batches in flight at once")
+    parser.add_argument("--requests-per-minute", type=int, default=EMBED_REQUESTS_PER_MINUTE,
+                        help="embedding API request rate limit")
+    args = parser.parse_args()
+
+    # Init Chroma
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    provider = make_embedding_provider(
+        args.embedding_provider, args.embedding_model or embedding_model_from_env(args.embedding_provider)
+    )
+    collection = open_listing_collection(client, CHROMA_DB_LISTINGS, provider)
+    print(f"🧮 Embedding with {provider.name}/{provider.model} ({provider.dimension}-d)")
+
+    if not args.skip_ingest:
+        # Servers with a listing table stop trusting their snapshot from here on
+        stamp_listing_revision(client, CHROMA_DB_LISTINGS, ingesting=True)
+        with open(args.feed, "r") as f:
+            rows = iter_listing_rows(f, args.feed, args.feed_format)
+            if args.stream:
+                asyncio.run(stream_ingest_listings(
+                    collection,
+                    rows,
+                    provider,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                    requests_per_minute=args.requests_per_minute,
+                    full=args.full
+                ))
+            else:
+                feed_stats = FeedStats(track_ids=True)
+                listings = list(valid_listings(rows, feed_stats))
+                print(f"📄 {feed_stats}")
+                # Prune against every id in the feed, so a listing whose row failed
+                # validation is kept; a row with no id could be any listing
+                feed_ids = feed_stats.listing_ids
+                if feed_stats.unidentified:
+                    print(f"⚠️ {feed_stats.unidentified} rows without a listing_id, not pruning removed listings")
+                    feed_ids = set()
+                asyncio.run(ingest_listings(
+                    collection,
+                    listings,
+                    provider,
+                    batch_size=args.batch_size,
+                    concurrency=args.concurrency,
+                    requests_per_minute=args.requests_per_minute,
+                    full=args.full,
+                    feed_ids=feed_ids
+                ))
+
+        # Rebuilt from the collection, so it always matches what was ingested. Both
+        # read it a page at a time, so --stream stays bounded by the index size
+        # rather than the feed's text
+        build_lexical_index(collection, args.lexical_index)
+        build_geo_index(collection, args.geo_index)
+        revision = stamp_listing_revision(client, CHROMA_DB_LISTINGS)
+        print(f"🏷️ Collection revision {revision}")
+
+    if args.export_index:
+        export_listing_index(collection, args.export_index)
+
+
+if __name__ == "__main__":
+    main()
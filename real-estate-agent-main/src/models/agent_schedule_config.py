@@ -6,4 +6,5 @@ class AgentScheduleConfig(BaseModel):
     work_end: time = Field(default=time(18, 0))
     appointment_duration: timedelta = Field(default=timedelta(hours=1))
     schedule_buffer: timedelta = Field(default=timedelta(minutes=30))
+    slot_granularity: timedelta = Field(default=timedelta(minutes=30))
     timezone: str = Field(default="America/Chicago")
\ No newline at end of file
@@ -1,5 +1,7 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+
+from utils.amenities import listing_highlight
 
 class PropertyRecommendation(BaseModel):
     listing_id: str
@@ -20,34 +22,67 @@ class PropertyRecommendation(BaseModel):
     latitude: float
     longitude: float
     description: str
+    # Search constraints loosened to find this listing; empty for exact matches
+    relaxed: List[str] = []
+
+# Compact projection returned to the model: only what it speaks about, plus
+# the listing_id to fetch the full PropertyRecommendation with when needed
+class PropertySummary(BaseModel):
+    listing_id: str
+    address: str
+    neighborhood: str
+    property_type: str
+    price: int
+    bedrooms: int
+    bathrooms: float
+    square_feet: int
+    highlight: str
+    relaxed: List[str] = []
+
+def recommendation_from_metadata(meta: dict, relaxed: Optional[List[str]] = None) -> PropertyRecommendation:
+    return PropertyRecommendation(
+        listing_id=meta["listing_id"],
+        address=meta["address"],
+        city=meta["city"],
+        state=meta["state"],
+        zip_code=meta["zip_code"],
+        neighborhood=meta["neighborhood"],
+        property_type=meta["property_type"],
+        bedrooms=meta["bedrooms"],
+        bathrooms=meta["bathrooms"],
+        square_feet=meta["square_feet"],
+        lot_size=meta["lot_size"],
+        price=meta["price"],
+        year_built=meta["year_built"],
+        mls_status=meta["mls_status"],
+        days_on_market=meta["days_on_market"],
+        latitude=meta["latitude"],
+        longitude=meta["longitude"],
+        description=meta["description"],
+        relaxed=relaxed or [],
+    )
+
+def summary_from_metadata(meta: dict, relaxed: Optional[List[str]] = None) -> PropertySummary:
+    return PropertySummary(
+        listing_id=meta["listing_id"],
+        address=meta["address"],
+        neighborhood=meta["neighborhood"],
+        property_type=meta["property_type"],
+        price=meta["price"],
+        bedrooms=meta["bedrooms"],
+        bathrooms=meta["bathrooms"],
+        square_feet=meta["square_feet"],
+        # Listings ingested before highlights existed get one on the fly
+        highlight=meta.get("highlight") or listing_highlight(meta["description"], meta.get("amenities")),
+        relaxed=relaxed or [],
+    )
 
 def parse_chroma_results(chroma_results: dict) -> List[PropertyRecommendation]:
-    documents = chroma_results["documents"][0]
     metadatas = chroma_results["metadatas"][0]
+    relaxed = chroma_results.get("relaxed", [[[] for _ in metadatas]])[0]
+    return [recommendation_from_metadata(meta, notes) for meta, notes in zip(metadatas, relaxed)]
 
-    recommendations = []
-    for doc, meta in zip(documents, metadatas):
-        recommendation = PropertyRecommendation(
-            listing_id=meta["listing_id"],
-            address=meta["address"],
-            city=meta["city"],
-            state=meta["state"],
-            zip_code=meta["zip_code"],
-            neighborhood=meta["neighborhood"],
-            property_type=meta["property_type"],
-            bedrooms=meta["bedrooms"],
-            bathrooms=meta["bathrooms"],
-            square_feet=meta["square_feet"],
-            lot_size=meta["lot_size"],
-            price=meta["price"],
-            year_built=meta["year_built"],
-            mls_status=meta["mls_status"],
-            days_on_market=meta["days_on_market"],
-            latitude=meta["latitude"],
-            longitude=meta["longitude"],
-            description=meta["description"],
-            full_text=doc,
-        )
-        recommendations.append(recommendation)
-
-    return recommendations
+def summarize_chroma_results(chroma_results: dict) -> List[PropertySummary]:
+    metadatas = chroma_results["metadatas"][0]
+    relaxed = chroma_results.get("relaxed", [[[] for _ in metadatas]])[0]
+    return [summary_from_metadata(meta, notes) for meta, notes in zip(metadatas, relaxed)]
@@ -15,6 +15,8 @@ class UserProfile(BaseModel):
     bathrooms: Optional[float] = None
     must_haves: List[str] = []
     good_to_haves: List[str] = []
+    neighborhoods: List[str] = []
+    radius_miles: Optional[float] = None
 
 def validate_user_profile(profile: UserProfile) -> List[str]:
     errors = []
@@ -75,30 +77,57 @@ def apply_defaults_to_profile(profile: UserProfile) -> UserProfile:
 
     return updated_profile
 
-def normalize_user_profile(profile: UserProfile) -> UserProfile:
-    return UserProfile(
-        name=profile.name,
-        phone=str(format_phone(profile.phone)),
-        buyOrRent=profile.buyOrRent.strip().lower(),
-        property_type=profile.property_type.strip(),
-        sqft=str(normalize_sqft(profile.sqft)),
-        bedrooms=str(normalize_bedrooms(profile.bedrooms)),
-        bathrooms=str(normalize_bathrooms(profile.bathrooms)),
-        budget=str(normalize_price(profile.budget)),
-        location=profile.location.strip().title(),
-        must_haves=profile.must_haves or [],
-        good_to_haves=profile.good_to_haves or []
-    )
-
-def normalize_price(price_input) -> int:
+# Applied to each field as it arrives, so the stored session profile is
+# always normalized and tools can use it as-is
+PROFILE_FIELD_NORMALIZERS = {
+    "name": lambda value: value.strip(),
+    "phone": lambda value: format_phone(value),
+    "buyOrRent": lambda value: value.strip().lower(),
+    "location": lambda value: value.strip().title(),
+    "property_type": lambda value: value.strip(),
+    "sqft": lambda value: optional_str(normalize_sqft(value)),
+    "budget": lambda value: optional_str(normalize_price(value)),
+    "bedrooms": lambda value: normalize_bedrooms(value),
+    "bathrooms": lambda value: normalize_bathrooms(value),
+    "neighborhoods": lambda value: [name.strip().title() for name in value if name.strip()],
+    "radius_miles": lambda value: normalize_number(value) or None,
+}
+
+def merge_profile_update(profile: UserProfile, update: UserProfile) -> List[str]:
+    """Normalize the fields set on `update` into `profile` in place.
+
+    Only fields the caller actually sent are applied; a field that is sent
+    replaces the stored value (lists included). A value with no number in it
+    ("flexible") clears the field, so it is reported missing and asked again.
+    Returns the updated field names.
+    """
+    updated = []
+    for field in update.model_fields_set:
+        value = getattr(update, field)
+        if value is None:
+            continue
+        normalizer = PROFILE_FIELD_NORMALIZERS.get(field)
+        value = normalizer(value) if normalizer else value
+        setattr(profile, field, value)
+        if value is not None:
+            updated.append(field)
+    return sorted(updated)
+
+def missing_profile_fields(profile: UserProfile) -> List[str]:
+    return [
+        field for field in ("name", "phone", "buyOrRent", "location", "property_type", "sqft", "budget", "bedrooms", "bathrooms")
+        if getattr(profile, field) in (None, "")
+    ]
+
+def normalize_price(price_input) -> Optional[int]:
     if isinstance(price_input, (int, float)):
         return int(price_input)
 
     price_input = str(price_input).lower().replace(",", "").strip()
-    matches = re.findall(r"[\d.]+", price_input)
+    matches = re.findall(r"\d+(?:\.\d+)?", price_input)
 
     if not matches:
-        return 0
+        return None
 
     multiplier = 1
     if "k" in price_input:
@@ -109,22 +138,27 @@ def normalize_price(price_input) -> int:
     numbers = [float(match) * multiplier for match in matches]
     return int(max(numbers))
 
-def normalize_number(input_val) -> float:
+def normalize_number(input_val) -> Optional[float]:
     if isinstance(input_val, (int, float)):
         return float(input_val)
     input_str = str(input_val).lower().replace(",", "").strip()
-    match = re.search(r"[\d.]+", input_str)
-    return float(match.group()) if match else 0.0
+    match = re.search(r"\d+(?:\.\d+)?", input_str)
+    return float(match.group()) if match else None
 
 
-def normalize_bedrooms(input_str: str) -> int:
-    return int(normalize_number(input_str))
+def normalize_bedrooms(input_str: str) -> Optional[int]:
+    number = normalize_number(input_str)
+    return int(number) if number is not None else None
 
-def normalize_bathrooms(input_str: str) -> float:
+def normalize_bathrooms(input_str: str) -> Optional[float]:
     return normalize_number(input_str)
 
-def normalize_sqft(input_str: str) -> int:
-    return int(normalize_number(input_str))
+def normalize_sqft(input_str: str) -> Optional[int]:
+    number = normalize_number(input_str)
+    return int(number) if number is not None else None
+
+def optional_str(value) -> Optional[str]:
+    return str(value) if value is not None else None
 
 # format phone number to e164 format
 def format_phone(phone: str, default_country_code: str = "+1") -> str:
@@ -0,0 +1,175 @@
+# Standard library imports
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Third-party library imports
+import numpy as np
+
+
+# Canonical amenity -> phrases that mean it, in listing descriptions or in what
+# callers say. These set the listing bits that must-haves filter on, so they
+# stay near-exact. Each amenity owns one bit (in this order), so never reorder
+# or remove entries; append new ones and bump AMENITY_VOCABULARY_VERSION.
+AMENITY_SYNONYMS: Dict[str, List[str]] = {
+    "garage": ["garage", "two car garage", "attached garage"],
+    "balcony": ["balcony", "private balcony"],
+    "patio": ["patio"],
+    "backyard": ["backyard", "back yard", "private yard"],
+    "basement": ["basement", "finished basement"],
+    "loft": ["loft", "upstairs loft"],
+    "central_air": ["central air", "central ac", "central air conditioning"],
+    "hardwood_floors": ["hardwood", "hardwood floors", "hardwood flooring"],
+    "carpeting": ["carpet", "carpeting", "carpeted"],
+    "walk_in_closet": ["walk in closet", "walk in closets"],
+    "soaking_tub": ["soaking tub", "soaker tub"],
+    "dual_vanities": ["dual vanities", "dual vanity", "double vanity", "double vanities"],
+    "glass_shower": ["glass enclosed shower", "glass shower"],
+    "stainless_appliances": ["stainless steel appliances", "stainless appliances"],
+    "updated_appliances": ["updated appliances", "new appliances"],
+    "granite_countertops": ["granite countertops", "granite counters"],
+    "quartz_countertops": ["quartz countertops", "quartz counters", "quartz surfaces"],
+    "custom_cabinetry": ["custom cabinetry", "custom cabinets"],
+    "recessed_lighting": ["recessed lighting"],
+    "landscaping": ["landscaping", "landscaped"],
+    "high_ceilings": ["high ceilings", "tall ceilings"],
+    "natural_light": ["natural light", "lots of natural light"],
+    "near_schools": ["near schools", "close to schools", "near top rated schools", "walking distance to schools"],
+    "near_transit": ["public transportation", "near transit", "near the train"],
+}
+# Looser phrases callers use for the same amenities. Only read from good-to-haves,
+# where a wrong guess costs a little ranking, never from must-haves or listings,
+# where it would let "parking" pass a garage filter
+AMENITY_LOOSE_SYNONYMS: Dict[str, List[str]] = {
+    "garage": ["parking", "parking spot", "carport"],
+    "balcony": ["terrace", "veranda"],
+    "patio": ["deck"],
+    "backyard": ["yard", "garden", "outdoor space"],
+    "central_air": ["air conditioning", "ac", "a c"],
+    "hardwood_floors": ["wood floors"],
+    "walk_in_closet": ["big closet"],
+    "soaking_tub": ["bathtub", "tub"],
+    "dual_vanities": ["double sink", "double sinks"],
+    "glass_shower": ["walk in shower"],
+    "stainless_appliances": ["stainless steel", "stainless"],
+    "updated_appliances": ["modern appliances"],
+    "granite_countertops": ["granite"],
+    "quartz_countertops": ["quartz"],
+    "natural_light": ["lots of light", "sunny", "bright"],
+    "near_schools": ["schools", "good schools"],
+    "near_transit": ["transit", "train"],
+}
+AMENITY_VOCABULARY_VERSION = 2
+
+AMENITY_BITS = {name: 1 << bit for bit, name in enumerate(AMENITY_SYNONYMS)}
+AMENITY_FLAG_PREFIX = "has_"
+# A listing with every good-to-have ranks as if its distance were this much smaller
+AMENITY_BOOST = 0.15
+
+# Amenities worth saying out loud first in a listing's highlight line
+HIGHLIGHT_PRIORITY = [
+    "backyard", "garage", "balcony", "patio", "loft", "basement", "soaking_tub", "high_ceilings",
+    "natural_light", "walk_in_closet", "hardwood_floors", "quartz_countertops", "granite_countertops",
+    "stainless_appliances", "custom_cabinetry", "glass_shower", "near_transit", "near_schools",
+]
+HIGHLIGHT_AMENITIES = 3
+# Listings without a known amenity fall back to the start of their description
+HIGHLIGHT_FALLBACK_WORDS = 12
+
+
+def normalize_phrase(text: str) -> str:
+    """Lowercase and collapse punctuation so "walk-in" matches "walk in"."""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def phrase_pattern(phrases: List[str]) -> re.Pattern:
+    # One alternation, longest phrases first, matched on whole words
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b")
+
+
+AMENITY_PATTERNS = {name: phrase_pattern(phrases) for name, phrases in AMENITY_SYNONYMS.items()}
+LOOSE_AMENITY_PATTERNS = {
+    name: phrase_pattern(phrases + AMENITY_LOOSE_SYNONYMS.get(name, []))
+    for name, phrases in AMENITY_SYNONYMS.items()
+}
+
+
+def extract_amenities(text: str, loose: bool = False) -> int:
+    """Bitmask of every amenity mentioned in `text` (e.g. a listing description)."""
+    normalized = normalize_phrase(text)
+    mask = 0
+    for name, pattern in (LOOSE_AMENITY_PATTERNS if loose else AMENITY_PATTERNS).items():
+        if pattern.search(normalized):
+            mask |= AMENITY_BITS[name]
+    return mask
+
+
+def amenity_mask(phrases: Iterable[str], loose: bool = False) -> Tuple[int, List[str]]:
+    """Bitmask for a caller's amenity phrases, plus the phrases outside the vocabulary.
+
+    `loose` also accepts AMENITY_LOOSE_SYNONYMS; use it for preferences only.
+    Unknown phrases can't be filtered on; they still reach the search through
+    the embedding text.
+    """
+    mask = 0
+    unknown = []
+    for phrase in phrases:
+        phrase_mask = extract_amenities(phrase, loose)
+        if phrase_mask:
+            mask |= phrase_mask
+        elif phrase.strip():
+            unknown.append(phrase)
+    return mask, unknown
+
+
+def amenity_names(mask: int) -> List[str]:
+    return [name for name, bit in AMENITY_BITS.items() if mask & bit]
+
+
+def amenity_metadata(description: str) -> dict:
+    """Listing metadata for the amenity index.
+
+    `amenities` is the bitmask used by the in-memory index and for boosting.
+    Chroma can't test bits in a `where` filter, so each present amenity also
+    gets a `has_<name>` flag (absent ones are left out to keep metadata small).
+    `highlight` is the short line compact search results carry.
+    """
+    mask = extract_amenities(description)
+    return {
+        "amenities": mask,
+        "highlight": listing_highlight(description, mask),
+        **{amenity_flag(name): True for name in amenity_names(mask)},
+    }
+
+
+def listing_highlight(description: str, mask: Optional[int] = None) -> str:
+    """A short, speakable line naming a listing's best amenities."""
+    mask = extract_amenities(description) if mask is None else mask
+    names = [name for name in HIGHLIGHT_PRIORITY if mask & AMENITY_BITS[name]][:HIGHLIGHT_AMENITIES]
+    if not names:
+        words = description.split()
+        return " ".join(words[:HIGHLIGHT_FALLBACK_WORDS]) + ("..." if len(words) > HIGHLIGHT_FALLBACK_WORDS else "")
+    phrases = [name.replace("_", " ") for name in names]
+    if len(phrases) == 1:
+        return f"Has {phrases[0]}"
+    return f"Has {', '.join(phrases[:-1])} and {phrases[-1]}"
+
+
+def amenity_flag(name: str) -> str:
+    return f"{AMENITY_FLAG_PREFIX}{name}"
+
+
+def preferred_share(masks: np.ndarray, preferred: int) -> np.ndarray:
+    """Fraction of the `preferred` amenities present in each mask."""
+    masks = np.asarray(masks, dtype=np.int64)
+    bits = [bit for bit in AMENITY_BITS.values() if preferred & bit]
+    if not bits:
+        return np.zeros(len(masks), dtype=np.float32)
+    return sum(((masks & bit) != 0).astype(np.float32) for bit in bits) / len(bits)
+
+
+def boosted_order(distances: np.ndarray, masks: np.ndarray, preferred: int) -> np.ndarray:
+    """Stable ranking of results by distance, shrunk by the share of `preferred` amenities each has."""
+    distances = np.asarray(distances, dtype=np.float32)
+    if not preferred or len(distances) == 0:
+        return np.argsort(distances, kind="stable")
+    return np.argsort(distances * (1.0 - AMENITY_BOOST * preferred_share(masks, preferred)), kind="stable")
@@ -1,16 +1,16 @@
 # Standard library imports
 from datetime import datetime, timedelta
-
-# Third-party library imports
-import requests
+from typing import Optional
 
 # Local application imports
 from models.property_recommendation import PropertyRecommendation
 from models.user_profile import UserProfile
+from utils.busy_slot_cache import get_busy_slot_cache
+from utils.n8n_client import get_n8n_client
 
 
 
-def send_appointment_to_n8n(
+async def send_appointment_to_n8n(
         profile: UserProfile,
         property: PropertyRecommendation,
         start_dt: datetime,
@@ -44,19 +44,22 @@ def send_appointment_to_n8n(
 
     print(f"schedule appt payload: {payload}")
     try:
-        response = requests.post(n8n_webhook_url, json=payload)
-        response.raise_for_status()
-        data = response.json()
+        # Not idempotent: a retried booking after a timeout could double-book the showing
+        data = await get_n8n_client().post(n8n_webhook_url, payload, idempotent=False)
+        # Write the booking through so the next availability check sees it
+        get_busy_slot_cache().add_busy_slot(n8n_webhook_url, start_dt, end_dt)
         return data.get("confirmation_message", "Your appointment has been scheduled.")
     except Exception as e:
         print(f"[schedule_appointment] Failed to call n8n: {e}")
         return "There was an issue scheduling the appointment. Please try again later."
 
 
-def fetch_busy_slots_from_n8n(
+async def fetch_busy_slots_from_n8n(
         start_datetime: datetime,
-        n8n_webhook_url: str) -> list[tuple[datetime, datetime]]:
-    end_datetime = start_datetime + timedelta(days=1)
+        n8n_webhook_url: str,
+        end_datetime: Optional[datetime] = None) -> list[tuple[datetime, datetime]]:
+    if end_datetime is None:
+        end_datetime = start_datetime + timedelta(days=1)
 
     payload = {
         "mode": "get_busy_slots",
@@ -64,9 +67,7 @@ def fetch_busy_slots_from_n8n(
         "end": end_datetime.isoformat()
     }
 
-    response = requests.post(n8n_webhook_url, json=payload)
-    response.raise_for_status()
-    data = response.json()
+    data = await get_n8n_client().post(n8n_webhook_url, payload)
 
     calendars = data.get("calendars", {})
     busy_slots = []
@@ -78,8 +79,3 @@ def fetch_busy_slots_from_n8n(
 
     print(f"agent's schedule {busy_slots}")
     return busy_slots
-
-
-
-
-
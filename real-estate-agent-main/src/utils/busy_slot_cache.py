@@ -0,0 +1,131 @@
+# Standard library imports
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+# Third-party library imports
+import pytz
+
+
+BUSY_SLOT_TTL_SECONDS = 120
+BUSY_SLOT_PREFETCH_DAYS = 7
+
+BusySlots = list[tuple[datetime, datetime]]
+BusySlotFetcher = Callable[[datetime, datetime], Awaitable[BusySlots]]
+
+
+class BusySlotCache:
+    """TTL cache of an agent's busy calendar intervals, bucketed per local day.
+
+    A miss fetches a multi-day window from n8n in one request and fills every
+    day in it, so follow-up questions about nearby days are served from memory.
+    Successful bookings are written through with `add_busy_slot`.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = BUSY_SLOT_TTL_SECONDS,
+        prefetch_days: int = BUSY_SLOT_PREFETCH_DAYS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.prefetch_days = prefetch_days
+        self.hits = 0
+        self.misses = 0
+
+        # (agent_key, day) -> (expires_at, busy intervals overlapping that day)
+        self._entries: dict[tuple[str, date], tuple[float, BusySlots]] = {}
+        # One in-flight fetch per agent so concurrent callers share it
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Timezone each agent's days were bucketed in
+        self._timezones: dict[str, pytz.BaseTzInfo] = {}
+
+    def _get_fresh(self, agent_key: str, day: date) -> Optional[BusySlots]:
+        entry = self._entries.get((agent_key, day))
+        if entry is None:
+            return None
+        expires_at, busy_slots = entry
+        if expires_at < time.monotonic():
+            del self._entries[(agent_key, day)]
+            return None
+        return busy_slots
+
+    def _collect(self, agent_key: str, days: list[date]) -> Optional[BusySlots]:
+        busy_slots = set()
+        for day in days:
+            day_slots = self._get_fresh(agent_key, day)
+            if day_slots is None:
+                return None
+            busy_slots.update(day_slots)
+        return sorted(busy_slots)
+
+    def _store(self, agent_key: str, window_days: list[date], tz: pytz.BaseTzInfo, busy_slots: BusySlots) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        self._timezones[agent_key] = tz
+        for day in window_days:
+            day_start, day_end = _day_bounds(day, tz)
+            day_slots = [(start, end) for start, end in busy_slots if start < day_end and end > day_start]
+            self._entries[(agent_key, day)] = (expires_at, day_slots)
+
+    async def get_busy_slots(
+        self,
+        agent_key: str,
+        start_day: date,
+        tz: pytz.BaseTzInfo,
+        fetch: BusySlotFetcher,
+        days: int = 1,
+    ) -> BusySlots:
+        requested_days = [start_day + timedelta(days=i) for i in range(days)]
+
+        cached = self._collect(agent_key, requested_days)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        lock = self._locks.setdefault(agent_key, asyncio.Lock())
+        async with lock:
+            # Another caller may have filled the window while we waited
+            cached = self._collect(agent_key, requested_days)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            window_days = [start_day + timedelta(days=i) for i in range(max(days, self.prefetch_days))]
+            window_start, _ = _day_bounds(window_days[0], tz)
+            _, window_end = _day_bounds(window_days[-1], tz)
+
+            busy_slots = await fetch(window_start, window_end)
+            self._store(agent_key, window_days, tz, busy_slots)
+
+        return self._collect(agent_key, requested_days) or []
+
+    def add_busy_slot(self, agent_key: str, start: datetime, end: datetime) -> None:
+        """Patch cached days with a newly booked interval instead of refetching."""
+        tz = self._timezones.get(agent_key)
+        for (key, day), (expires_at, busy_slots) in list(self._entries.items()):
+            if key != agent_key:
+                continue
+            day_start, day_end = _day_bounds(day, tz)
+            if start < day_end and end > day_start:
+                self._entries[(key, day)] = (expires_at, busy_slots + [(start, end)])
+
+    def invalidate(self, agent_key: str, day: Optional[date] = None) -> None:
+        for key, cached_day in list(self._entries):
+            if key == agent_key and (day is None or cached_day == day):
+                del self._entries[(key, cached_day)]
+
+
+def _day_bounds(day: date, tz: pytz.BaseTzInfo) -> tuple[datetime, datetime]:
+    start = datetime.combine(day, datetime.min.time())
+    return tz.localize(start), tz.localize(start + timedelta(days=1))
+
+
+_busy_slot_cache: Optional[BusySlotCache] = None
+
+
+def get_busy_slot_cache() -> BusySlotCache:
+    global _busy_slot_cache
+    if _busy_slot_cache is None:
+        _busy_slot_cache = BusySlotCache()
+    return _busy_slot_cache
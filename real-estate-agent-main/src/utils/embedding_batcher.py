@@ -0,0 +1,86 @@
+# Standard library imports
+import asyncio
+from typing import Optional
+
+# Local application imports
+from utils.embedding_providers import EmbeddingProvider
+
+
+EMBEDDING_BATCH_MAX_SIZE = 64
+EMBEDDING_BATCH_MAX_WAIT_MS = 5.0
+
+
+class EmbeddingBatcher:
+    """Async micro-batcher for embedding requests.
+
+    Requests from all concurrent sessions are collected for up to
+    `max_wait_ms` (or until `max_batch_size` texts are queued), sent as a
+    single provider call, and each caller's future gets its own vector.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS,
+    ):
+        self.provider = provider
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.api_calls = 0
+        self.texts_embedded = 0
+
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Strong references so in-flight batch tasks aren't garbage collected
+        self._inflight: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        # Identical texts in one window share a single input
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+
+        try:
+            self.api_calls += 1
+            vectors = await self.provider.embed_batch(unique_texts)
+            embeddings = dict(zip(unique_texts, vectors))
+            self.texts_embedded += len(unique_texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(embeddings[text])
+
+    def stats(self) -> dict:
+        return {
+            "api_calls": self.api_calls,
+            "texts_embedded": self.texts_embedded,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,130 @@
+# Standard library imports
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_MEMORY_ENTRIES = 2048
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: in-process LRU in front of SQLite.
+
+    Entries are keyed by sha256(model + text), so the same text embedded with a
+    different model never collides. Vectors are stored on disk as float32 blobs.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        # Guards the LRU and counters; SQLite has its own lock so disk I/O never holds up memory hits
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, dimension INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, embedding: list[float]) -> None:
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get_from_memory(self, key: str) -> Optional[list[float]]:
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return embedding
+
+    def _get_from_disk(self, key: str) -> Optional[list[float]]:
+        with self._db_lock:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            embedding = array("f", row[0]).tolist()
+            self._remember(key, embedding)
+            self.disk_hits += 1
+            return embedding
+
+    def _write(self, key: str, model: str, embedding: list[float]) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, model, dimension, vector) VALUES (?, ?, ?, ?)",
+                (key, model, len(embedding), array("f", embedding).tobytes()),
+            )
+            self._db.commit()
+
+    def get(self, model: str, text: str) -> Optional[list[float]]:
+        key = self.make_key(model, text)
+        embedding = self._get_from_memory(key)
+        return embedding if embedding is not None else self._get_from_disk(key)
+
+    def put(self, model: str, text: str, embedding: list[float]) -> None:
+        key = self.make_key(model, text)
+        with self._lock:
+            self._remember(key, embedding)
+        self._write(key, model, embedding)
+
+    # Async variants for the event loop: memory hits are answered inline, SQLite
+    # reads and commits run in a worker thread so a live call never waits on disk
+
+    async def aget(self, model: str, text: str) -> Optional[list[float]]:
+        key = self.make_key(model, text)
+        embedding = self._get_from_memory(key)
+        return embedding if embedding is not None else await asyncio.to_thread(self._get_from_disk, key)
+
+    async def aput(self, model: str, text: str, embedding: list[float]) -> None:
+        key = self.make_key(model, text)
+        with self._lock:
+            self._remember(key, embedding)
+        await asyncio.to_thread(self._write, key, model, embedding)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._db.close()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
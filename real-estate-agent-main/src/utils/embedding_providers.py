@@ -0,0 +1,193 @@
+# Standard library imports
+import asyncio
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Optional
+
+# Third-party library imports
+import numpy as np
+import openai
+
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+HASHING_EMBEDDING_DIMENSION = 384
+SENTENCE_TRANSFORMER_MODEL = "all-MiniLM-L6-v2"
+
+# Collection metadata keys recording which embedding space the vectors live in
+PROVIDER_METADATA_KEY = "embedding_provider"
+MODEL_METADATA_KEY = "embedding_model"
+DIMENSION_METADATA_KEY = "embedding_dimension"
+
+# Collections ingested before providers were tagged were all built with OpenAI
+LEGACY_EMBEDDING_TAGS = {
+    PROVIDER_METADATA_KEY: "openai",
+    MODEL_METADATA_KEY: OPENAI_EMBEDDING_MODEL,
+    DIMENSION_METADATA_KEY: OPENAI_EMBEDDING_DIMENSIONS[OPENAI_EMBEDDING_MODEL],
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9$]+")
+
+
+class EmbeddingProvider(ABC):
+    """Turns batches of texts into fixed-size vectors."""
+
+    name: str
+    model: str
+    dimension: int
+
+    @abstractmethod
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        ...
+
+    @property
+    def cache_key(self) -> str:
+        # Namespaces the embedding cache so providers never share entries
+        return f"{self.name}:{self.model}:{self.dimension}"
+
+    def collection_tags(self) -> dict:
+        return {
+            PROVIDER_METADATA_KEY: self.name,
+            MODEL_METADATA_KEY: self.model,
+            DIMENSION_METADATA_KEY: self.dimension,
+        }
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    name = "openai"
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL):
+        if model not in OPENAI_EMBEDDING_DIMENSIONS:
+            raise ValueError(f"Unknown OpenAI embedding model: {model}")
+        self.model = model
+        self.dimension = OPENAI_EMBEDDING_DIMENSIONS[model]
+        self._client: Optional[openai.AsyncOpenAI] = None
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        if self._client is None:
+            self._client = openai.AsyncOpenAI()
+        response = await self._client.embeddings.create(input=texts, model=self.model)
+        return [item.embedding for item in response.data]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic local embeddings from hashed word unigrams and bigrams.
+
+    No model download and no network, so it suits tests, offline benchmarks and
+    latency-sensitive deployments that can trade some recall for speed.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = HASHING_EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self.model = f"hashing-v1-{dimension}"
+
+    def embed_one(self, text: str) -> list[float]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature in features:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            # Low bits pick the bucket, the top bit the sign
+            vector[digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """Local CPU embeddings from a sentence-transformers model (optional dependency)."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = SENTENCE_TRANSFORMER_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_PROVIDER=sentence-transformers requires `pip install sentence-transformers`"
+            ) from e
+
+        self.model = model
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dimension = self._model.get_sentence_embedding_dimension()
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        # Inference is CPU-bound, keep it off the event loop
+        embeddings = await asyncio.to_thread(self._model.encode, texts, normalize_embeddings=True)
+        return embeddings.tolist()
+
+
+def hashing_dimension(value: Optional[str]) -> int:
+    """Dimension of the hashing provider from its configured model value."""
+    if not value:
+        return HASHING_EMBEDDING_DIMENSION
+    if not value.strip().isdigit() or int(value) <= 0:
+        raise ValueError(
+            f"The hashing embedding provider takes a positive dimension, not {value!r}. "
+            "Set HASHING_EMBEDDING_DIMENSION (or --embedding-model for load_listings.py) to a number."
+        )
+    return int(value)
+
+
+def embedding_model_from_env(name: str) -> Optional[str]:
+    """The configured model for provider `name`; the hashing provider has its own variable.
+
+    EMBEDDING_MODEL usually names an OpenAI model, which means nothing to the
+    hashing provider, so its dimension comes from HASHING_EMBEDDING_DIMENSION.
+    """
+    if name == "hashing":
+        return os.getenv("HASHING_EMBEDDING_DIMENSION")
+    return os.getenv("EMBEDDING_MODEL")
+
+
+def make_embedding_provider(name: str, model: Optional[str] = None) -> EmbeddingProvider:
+    if name == "openai":
+        return OpenAIEmbeddingProvider(model or OPENAI_EMBEDDING_MODEL)
+    if name == "hashing":
+        return HashingEmbeddingProvider(hashing_dimension(model))
+    if name == "sentence-transformers":
+        return SentenceTransformerEmbeddingProvider(model or SENTENCE_TRANSFORMER_MODEL)
+    raise ValueError(f"Unknown embedding provider: {name}")
+
+
+def check_embedding_tags(tags: Optional[dict], provider: EmbeddingProvider, source: str) -> None:
+    """Raise if vectors tagged with `tags` can't be compared with `provider`'s."""
+    stored = {key: (tags or {}).get(key) for key in LEGACY_EMBEDDING_TAGS}
+    if stored[PROVIDER_METADATA_KEY] is None:
+        stored = LEGACY_EMBEDDING_TAGS
+
+    expected = provider.collection_tags()
+    if stored != expected:
+        raise ValueError(
+            f"{source} was embedded with {stored[PROVIDER_METADATA_KEY]}/{stored[MODEL_METADATA_KEY]} "
+            f"({stored[DIMENSION_METADATA_KEY]}-d) but the configured provider is "
+            f"{provider.name}/{provider.model} ({provider.dimension}-d). "
+            "Re-ingest the listings with this provider or change EMBEDDING_PROVIDER/EMBEDDING_MODEL "
+            "(HASHING_EMBEDDING_DIMENSION for the hashing provider)."
+        )
+
+
+_embedding_provider: Optional[EmbeddingProvider] = None
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    global _embedding_provider
+    if _embedding_provider is None:
+        # Read lazily so entry points can load_dotenv() first
+        name = os.getenv("EMBEDDING_PROVIDER", "openai")
+        _embedding_provider = make_embedding_provider(name, embedding_model_from_env(name))
+    return _embedding_provider
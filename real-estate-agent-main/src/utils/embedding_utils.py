@@ -1,17 +1,33 @@
-# Third-party library imports
-import openai
+# Standard library imports
+from typing import Optional
 
 # Local application imports
 from models.user_profile import UserProfile
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.embedding_cache import get_embedding_cache
+from utils.embedding_providers import get_embedding_provider
 
+_embedding_batcher: Optional[EmbeddingBatcher] = None
 
-# Function to embed using OpenAI
-def get_embedding(text: str):
-    response = openai.embeddings.create(
-        input=[text],
-        model="text-embedding-3-small"
-    )
-    return response.data[0].embedding
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        _embedding_batcher = EmbeddingBatcher(provider=get_embedding_provider())
+    return _embedding_batcher
+
+
+# Function to embed with the configured provider, served from the embedding cache when possible
+async def get_embedding(text: str):
+    cache = get_embedding_cache()
+    cache_key = get_embedding_provider().cache_key
+    embedding = await cache.aget(cache_key, text)
+    if embedding is not None:
+        return embedding
+
+    embedding = await get_embedding_batcher().embed(text)
+    await cache.aput(cache_key, text, embedding)
+    return embedding
 
 
 def profile_to_text(profile: UserProfile) -> str:
@@ -20,7 +36,7 @@ def profile_to_text(profile: UserProfile) -> str:
         f"{profile.bedrooms or ''} bedroom(s), "
         f"{profile.bathrooms or ''} bathroom(s), "
         f"{profile.budget or ''} budget, "
-        f"in {profile.location or ''}, "
+        f"in {', '.join([*profile.neighborhoods, profile.location or ''])}, "
         f"Must haves: {', '.join(profile.must_haves)}, "
         f"Good to haves: {', '.join(profile.good_to_haves)}"
     )
\ No newline at end of file
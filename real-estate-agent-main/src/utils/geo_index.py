@@ -0,0 +1,214 @@
+# Standard library imports
+import json
+import math
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Third-party library imports
+import numpy as np
+
+
+# Bump when the on-disk layout changes; load() refuses other versions
+GEO_INDEX_FORMAT_VERSION = 1
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+# Grid cell size; 0.02 degrees is about 1.4 miles of latitude
+GEO_CELL_DEGREES = 0.02
+LONGITUDE_CELLS = math.ceil(360 / GEO_CELL_DEGREES)
+# Above this share of candidate rows a radius query scans everything instead
+GEO_SCAN_FRACTION = 0.25
+
+
+def haversine_miles(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def cell_coordinates(latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+    lat_cells = np.floor((np.asarray(latitudes, dtype=np.float64) + 90) / GEO_CELL_DEGREES).astype(np.int64)
+    lon_cells = np.floor((np.asarray(longitudes, dtype=np.float64) + 180) / GEO_CELL_DEGREES).astype(np.int64)
+    return lat_cells, np.minimum(lon_cells, LONGITUDE_CELLS - 1)
+
+
+class GeoIndex:
+    """Grid bucket map over listing coordinates, plus neighborhood centroids.
+
+    Listings are bucketed into fixed lat/lon cells; the cell keys are kept
+    sorted with the matching rows, so a radius query is one `searchsorted`
+    per latitude band of the bounding box followed by an exact haversine
+    check on just those candidates.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        cell_keys: np.ndarray,
+        cell_rows: np.ndarray,
+        centroids: Dict[str, Tuple[float, float]],
+        manifest: Optional[dict] = None,
+    ):
+        self.ids = ids
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        # cell_rows[i] lives in cell cell_keys[i]; keys ascending
+        self.cell_keys = cell_keys
+        self.cell_rows = cell_rows
+        self.centroids = centroids
+        self.manifest = manifest or {}
+        self._centroid_names = {name.lower(): name for name in centroids}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, ids: Sequence[str], latitudes, longitudes, neighborhoods: Sequence[str]) -> "GeoIndex":
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        lat_cells, lon_cells = cell_coordinates(latitudes, longitudes)
+        keys = lat_cells * LONGITUDE_CELLS + lon_cells
+        order = np.argsort(keys, kind="stable")
+
+        centroids = {}
+        neighborhoods = np.asarray(neighborhoods, dtype=str)
+        for name in np.unique(neighborhoods):
+            rows = neighborhoods == name
+            centroids[str(name)] = (float(latitudes[rows].mean()), float(longitudes[rows].mean()))
+
+        return cls(
+            ids=np.asarray(ids, dtype=str),
+            latitudes=latitudes,
+            longitudes=longitudes,
+            cell_keys=keys[order],
+            cell_rows=order.astype(np.int64),
+            centroids=centroids,
+        )
+
+    @classmethod
+    def from_chroma_collection(cls, collection, page_size: int = 5000) -> "GeoIndex":
+        # Each page is reduced to arrays before the next, so metadata dicts never pile up
+        ids, latitudes, longitudes, neighborhoods = [], [], [], []
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids.append(np.array(page["ids"], dtype=str))
+            latitudes.append(np.array([metadata["latitude"] for metadata in page["metadatas"]], dtype=np.float64))
+            longitudes.append(np.array([metadata["longitude"] for metadata in page["metadatas"]], dtype=np.float64))
+            neighborhoods.append(np.array([metadata["neighborhood"] for metadata in page["metadatas"]], dtype=str))
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+        return cls.from_records(
+            np.concatenate(ids), np.concatenate(latitudes), np.concatenate(longitudes), np.concatenate(neighborhoods)
+        )
+
+    def neighborhood(self, name: str) -> Optional[str]:
+        """The indexed spelling of a neighborhood name, matched case-insensitively."""
+        return self._centroid_names.get(name.strip().lower())
+
+    def centroid(self, neighborhood: str) -> Optional[Tuple[float, float]]:
+        name = self.neighborhood(neighborhood)
+        return self.centroids[name] if name else None
+
+    def candidate_rows(self, latitude: float, longitude: float, miles: float) -> Optional[np.ndarray]:
+        """Rows in the grid cells covering the circle's bounding box (a superset).
+
+        None means every row is a candidate and is cheaper to scan directly.
+        """
+        delta_lat = miles / MILES_PER_DEGREE_LATITUDE
+        cos_lat = math.cos(math.radians(min(abs(latitude) + delta_lat, 90.0)))
+        delta_lon = miles / (MILES_PER_DEGREE_LATITUDE * cos_lat) if cos_lat > 1e-6 else 360.0
+        # Boxes touching a pole or the antimeridian just scan everything
+        if abs(latitude) + delta_lat >= 90 or abs(longitude) + delta_lon >= 180:
+            return None
+
+        (lat_lo, lat_hi), (lon_lo, lon_hi) = cell_coordinates(
+            [latitude - delta_lat, latitude + delta_lat], [longitude - delta_lon, longitude + delta_lon]
+        )
+        # Within one latitude band the box's cells are a contiguous key range
+        bands = np.arange(lat_lo, lat_hi + 1) * LONGITUDE_CELLS
+        starts = np.searchsorted(self.cell_keys, bands + lon_lo, side="left")
+        ends = np.searchsorted(self.cell_keys, bands + lon_hi, side="right")
+        total = int((ends - starts).sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Gathering most of the index costs more than one vectorized pass over it
+        if total > len(self.ids) * GEO_SCAN_FRACTION:
+            return None
+        return np.concatenate([self.cell_rows[start:end] for start, end in zip(starts, ends) if end > start])
+
+    def mask_within(self, centers: Sequence[Tuple[float, float]], miles: float) -> np.ndarray:
+        """Boolean row mask of listings within `miles` of any of `centers`."""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for latitude, longitude in centers:
+            rows = self.candidate_rows(latitude, longitude, miles)
+            if rows is None:
+                mask |= haversine_miles(latitude, longitude, self.latitudes, self.longitudes) <= miles
+            else:
+                distances = haversine_miles(latitude, longitude, self.latitudes[rows], self.longitudes[rows])
+                mask[rows[distances <= miles]] = True
+        return mask
+
+    def ids_within(self, centers: Sequence[Tuple[float, float]], miles: float) -> List[str]:
+        return [str(listing_id) for listing_id in self.ids[self.mask_within(centers, miles)]]
+
+    def save(self, path: str, source: Optional[str] = None) -> dict:
+        """Write the index as a versioned artifact directory; returns its manifest."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for name in ("ids", "latitudes", "longitudes", "cell_keys", "cell_rows"):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(getattr(self, name)))
+
+        manifest = {
+            **self.manifest,
+            "format_version": GEO_INDEX_FORMAT_VERSION,
+            "built_at": int(time.time()),
+            "source": source,
+            "count": len(self),
+            "cell_degrees": GEO_CELL_DEGREES,
+            "centroids": self.centroids,
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(path):
+            old_path = f"{path}.old-{os.getpid()}"
+            os.rename(path, old_path)
+            os.rename(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.rename(tmp_path, path)
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "GeoIndex":
+        """Memory-map a saved artifact read-only."""
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != GEO_INDEX_FORMAT_VERSION or manifest.get("cell_degrees") != GEO_CELL_DEGREES:
+            raise ValueError(
+                f"Geo index at {path} has format version {manifest.get('format_version')} "
+                f"({manifest.get('cell_degrees')} degree cells), expected {GEO_INDEX_FORMAT_VERSION} "
+                f"({GEO_CELL_DEGREES}). Rebuild it with load_listings.py."
+            )
+
+        def mapped(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        return cls(
+            ids=mapped("ids"),
+            latitudes=mapped("latitudes"),
+            longitudes=mapped("longitudes"),
+            cell_keys=mapped("cell_keys"),
+            cell_rows=mapped("cell_rows"),
+            centroids={name: tuple(point) for name, point in manifest.pop("centroids").items()},
+            manifest=manifest,
+        )
@@ -0,0 +1,153 @@
+# Standard library imports
+import json
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+# Third-party library imports
+from pydantic import BaseModel
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    RetryPromptPart,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+
+HISTORY_TOKEN_BUDGET = 6000
+HISTORY_KEEP_RECENT_TURNS = 2
+TOOL_RETURN_SUMMARY_CHARS = 240
+# Marks the profile snapshot carried over when turns are dropped
+PROFILE_FACTS_PREFIX = "Caller profile saved so far: "
+
+
+@dataclass
+class CompactionStats:
+    tokens_before: int
+    tokens_after: int
+    truncated_tool_returns: int = 0
+    dropped_turns: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prompts
+    return (len(text) + 3) // 4
+
+
+def part_text(part) -> str:
+    if isinstance(part, (SystemPromptPart, TextPart)):
+        return part.content
+    if isinstance(part, UserPromptPart):
+        return part.content if isinstance(part.content, str) else str(part.content)
+    if isinstance(part, ToolCallPart):
+        return part.args_as_json_str()
+    if isinstance(part, ToolReturnPart):
+        return part.model_response_str()
+    if isinstance(part, RetryPromptPart):
+        return part.model_response()
+    return ""
+
+
+def estimate_history_tokens(message_history: List[ModelMessage]) -> int:
+    return sum(estimate_tokens(part_text(part)) for message in message_history for part in message.parts)
+
+
+def split_turns(message_history: List[ModelMessage]) -> List[List[ModelMessage]]:
+    """Group messages into turns, each starting at a request carrying a user prompt."""
+    turns: List[List[ModelMessage]] = []
+    for message in message_history:
+        starts_turn = isinstance(message, ModelRequest) and any(isinstance(p, UserPromptPart) for p in message.parts)
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def summarize_tool_return(content) -> str:
+    """Shrink a tool result to the identifiers the model needs to refer back to it."""
+    if isinstance(content, list) and content and all(isinstance(item, (BaseModel, dict)) for item in content):
+        items = [item.model_dump() if isinstance(item, BaseModel) else item for item in content]
+        if all("listing_id" in item for item in items):
+            return json.dumps([
+                {key: item.get(key) for key in ("listing_id", "address", "price")}
+                for item in items
+            ])
+
+    text = content if isinstance(content, str) else json.dumps(content, default=str)
+    if len(text) <= TOOL_RETURN_SUMMARY_CHARS:
+        return text
+    return text[:TOOL_RETURN_SUMMARY_CHARS] + "... [truncated]"
+
+
+def compact_message_history(
+    message_history: List[ModelMessage],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS,
+    profile_facts: Optional[dict] = None,
+) -> tuple[List[ModelMessage], CompactionStats]:
+    """Compact history before a run so prompt tokens stay under `token_budget`.
+
+    1. Tool results older than the last `keep_recent_turns` turns are shrunk to
+       a short summary (listing ids/addresses/prices for recommendations).
+    2. If still over budget, the oldest resolved turns are dropped whole (so
+       tool calls and returns stay paired). The system prompt and
+       `profile_facts` (the session's saved caller profile) are carried over
+       as system prompt parts.
+    """
+    tokens_before = estimate_history_tokens(message_history)
+    stats = CompactionStats(tokens_before=tokens_before, tokens_after=tokens_before)
+    if tokens_before <= token_budget:
+        return message_history, stats
+
+    turns = split_turns(message_history)
+    old_turns, recent_turns = turns[:-keep_recent_turns], turns[-keep_recent_turns:]
+
+    # Stage 1: shrink old tool results
+    compacted_old = []
+    for turn in old_turns:
+        compacted_turn = []
+        for message in turn:
+            if isinstance(message, ModelRequest) and any(isinstance(p, ToolReturnPart) for p in message.parts):
+                parts = []
+                for part in message.parts:
+                    if isinstance(part, ToolReturnPart):
+                        part = replace(part, content=summarize_tool_return(part.content))
+                        stats.truncated_tool_returns += 1
+                    parts.append(part)
+                message = replace(message, parts=parts)
+            compacted_turn.append(message)
+        compacted_old.append(compacted_turn)
+
+    turns = compacted_old + recent_turns
+    compacted = [message for turn in turns for message in turn]
+
+    # Stage 2: drop the oldest resolved turns while over budget
+    if estimate_history_tokens(compacted) > token_budget and compacted_old:
+        system_parts = [p for p in message_history[0].parts if isinstance(p, SystemPromptPart)]
+
+        while len(turns) > keep_recent_turns:
+            turns = turns[1:]
+            stats.dropped_turns += 1
+            candidate = [message for turn in turns for message in turn]
+            if estimate_history_tokens(candidate) + sum(estimate_tokens(p.content) for p in system_parts) <= token_budget:
+                break
+
+        carried_parts = list(system_parts)
+        if profile_facts:
+            # Replace the snapshot an earlier compaction carried, don't stack another one
+            carried_parts = [p for p in carried_parts if not p.content.startswith(PROFILE_FACTS_PREFIX)]
+            carried_parts.append(SystemPromptPart(content=PROFILE_FACTS_PREFIX + json.dumps(profile_facts)))
+
+        first_request = turns[0][0]
+        turns[0][0] = replace(first_request, parts=carried_parts + list(first_request.parts))
+        compacted = [message for turn in turns for message in turn]
+
+    stats.tokens_after = estimate_history_tokens(compacted)
+    return compacted, stats
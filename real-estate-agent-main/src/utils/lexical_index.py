@@ -0,0 +1,196 @@
+# Standard library imports
+import json
+import math
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Third-party library imports
+import numpy as np
+
+
+# Bump when the on-disk layout changes; load() refuses other versions
+LEXICAL_INDEX_FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words that appear in almost every listing or query and carry no signal
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "in", "on", "at", "to", "for", "with", "from", "by", "or",
+    "is", "it", "this", "that", "you", "your", "s", "ll", "t", "won", "be", "as",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 index over listing documents, stored as per-term postings.
+
+    BM25 term weights are computed once when the index is built, so scoring a
+    query against a candidate set is one `searchsorted` per query term. The
+    index is saved as a directory of `.npy` files plus a JSON manifest and
+    loaded back memory-mapped read-only, like `ListingIndex`.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        weights: np.ndarray,
+        manifest: Optional[dict] = None,
+    ):
+        self.ids = ids
+        self.vocab = vocab
+        # Postings of term t are rows[offsets[t]:offsets[t + 1]] (ascending) and their weights
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.manifest = manifest or {}
+        self._row_of = {str(listing_id): row for row, listing_id in enumerate(ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_documents(cls, ids: List[str], documents: List[str], k1: float = BM25_K1, b: float = BM25_B) -> "LexicalIndex":
+        return cls.from_pages([(ids, documents)], k1=k1, b=b)
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Tuple[List[str], List[str]]], k1: float = BM25_K1, b: float = BM25_B) -> "LexicalIndex":
+        """Build from (ids, documents) pages, one page of documents in memory at a time.
+
+        Each page is reduced to flat (term, row, tf) arrays before the next is
+        read, so peak memory is the postings themselves, not the corpus text.
+        """
+        vocab: Dict[str, int] = {}
+        id_chunks, length_chunks, term_chunks, row_chunks, tf_chunks = [], [], [], [], []
+        count = 0
+        for page_ids, documents in pages:
+            terms, rows, tfs, lengths = [], [], [], []
+            for row, document in enumerate(documents, start=count):
+                counts = Counter(tokenize(document))
+                lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    terms.append(vocab.setdefault(term, len(vocab)))
+                    rows.append(row)
+                    tfs.append(tf)
+            id_chunks.append(np.array(page_ids, dtype=str))
+            length_chunks.append(np.array(lengths, dtype=np.float32))
+            term_chunks.append(np.array(terms, dtype=np.int32))
+            row_chunks.append(np.array(rows, dtype=np.int32))
+            tf_chunks.append(np.array(tfs, dtype=np.float32))
+            count += len(page_ids)
+
+        lengths = np.concatenate(length_chunks) if count else np.zeros(0, dtype=np.float32)
+        avg_length = float(lengths.mean()) if count else 0.0
+        terms = np.concatenate(term_chunks) if term_chunks else np.zeros(0, dtype=np.int32)
+        # Stable, so each term's postings keep their ascending row order
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        rows = np.concatenate(row_chunks)[order] if term_chunks else np.zeros(0, dtype=np.int32)
+        tf = np.concatenate(tf_chunks)[order] if term_chunks else np.zeros(0, dtype=np.float32)
+        del order
+
+        document_frequency = np.bincount(terms, minlength=len(vocab))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(document_frequency)
+        idf = np.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = k1 * (1 - b + b * lengths[rows] / avg_length)
+        weights = (idf[terms] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+        return cls(
+            ids=np.concatenate(id_chunks) if id_chunks else np.zeros(0, dtype=str),
+            vocab=vocab,
+            offsets=offsets,
+            rows=rows,
+            weights=weights,
+            manifest={"k1": k1, "b": b, "avg_length": avg_length},
+        )
+
+    @classmethod
+    def from_chroma_collection(cls, collection, page_size: int = 5000) -> "LexicalIndex":
+        def pages():
+            offset = 0
+            while True:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset)
+                yield page["ids"], page["documents"]
+                if len(page["ids"]) < page_size:
+                    return
+                offset += page_size
+
+        return cls.from_pages(pages())
+
+    def score(self, ids: List[str], query: str) -> np.ndarray:
+        """BM25 score of `query` for each listing in `ids` (0 for unknown listings)."""
+        candidate_rows = np.array([self._row_of.get(str(listing_id), -1) for listing_id in ids], dtype=np.int64)
+        scores = np.zeros(len(candidate_rows), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            term_rows = self.rows[start:end]
+            positions = np.minimum(np.searchsorted(term_rows, candidate_rows), end - start - 1)
+            hits = term_rows[positions] == candidate_rows
+            scores[hits] += self.weights[start:end][positions[hits]]
+        return scores
+
+    def save(self, path: str, source: Optional[str] = None) -> dict:
+        """Write the index as a versioned artifact directory; returns its manifest."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for name in ("ids", "offsets", "rows", "weights"):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(getattr(self, name)))
+
+        manifest = {
+            **self.manifest,
+            "format_version": LEXICAL_INDEX_FORMAT_VERSION,
+            "built_at": int(time.time()),
+            "source": source,
+            "count": len(self),
+            "vocab": self.vocab,
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(path):
+            old_path = f"{path}.old-{os.getpid()}"
+            os.rename(path, old_path)
+            os.rename(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.rename(tmp_path, path)
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """Memory-map a saved artifact read-only."""
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != LEXICAL_INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Lexical index at {path} has format version {manifest.get('format_version')}, "
+                f"expected {LEXICAL_INDEX_FORMAT_VERSION}. Rebuild it with load_listings.py."
+            )
+
+        def mapped(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        return cls(
+            ids=mapped("ids"),
+            vocab=manifest.pop("vocab"),
+            offsets=mapped("offsets"),
+            rows=mapped("rows"),
+            weights=mapped("weights"),
+            manifest=manifest,
+        )
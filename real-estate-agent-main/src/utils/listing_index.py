@@ -0,0 +1,355 @@
+# Standard library imports
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+# Third-party library imports
+import numpy as np
+
+# Local application imports
+from utils.amenities import boosted_order
+from utils.geo_index import GEO_CELL_DEGREES, GeoIndex
+from utils.listing_search import ListingFilter
+
+
+# Bump when the on-disk layout changes; load() refuses other versions
+INDEX_FORMAT_VERSION = 4
+
+NUMERIC_COLUMNS = {
+    "price": np.int64,
+    "square_feet": np.int64,
+    "bedrooms": np.int64,
+    "bathrooms": np.float32,
+    "latitude": np.float64,
+    "longitude": np.float64,
+}
+CATEGORICAL_COLUMNS = ["city", "property_type", "neighborhood"]
+
+
+class InMemoryRecords:
+    """Listing metadata and documents held as Python objects."""
+
+    def __init__(self, metadatas: List[dict], documents: List[str]):
+        self.metadatas = metadatas
+        self.documents = documents
+
+    def __getitem__(self, row: int) -> tuple[dict, str]:
+        return self.metadatas[row], self.documents[row]
+
+    def to_bytes(self) -> tuple[bytes, np.ndarray]:
+        encoded = [
+            json.dumps({"metadata": m, "document": d}, separators=(",", ":")).encode("utf-8")
+            for m, d in zip(self.metadatas, self.documents)
+        ]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(e) for e in encoded])
+        return b"".join(encoded), offsets
+
+
+class MappedRecords:
+    """Listing metadata and documents decoded on demand from a read-only mmap."""
+
+    def __init__(self, path: str, offsets: np.ndarray):
+        self.offsets = offsets
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+
+    def __getitem__(self, row: int) -> tuple[dict, str]:
+        record = json.loads(self._buffer[self.offsets[row]:self.offsets[row + 1]])
+        return record["metadata"], record["document"]
+
+    def to_bytes(self) -> tuple[bytes, np.ndarray]:
+        return bytes(self._buffer), np.asarray(self.offsets)
+
+
+class ListingIndex:
+    """In-process vector + columnar metadata index over the listing catalogue.
+
+    Embeddings live in one contiguous float32 matrix and the filterable fields in
+    typed column arrays, so a query is a handful of vectorized boolean masks, one
+    matrix-vector product and an `argpartition` for the top-k. Results use the
+    same shape as `chromadb.Collection.query`.
+
+    The index can be saved as a directory of `.npy` files plus a JSON manifest
+    and loaded back with every array memory-mapped read-only, so several worker
+    processes share one physical copy through the page cache. That includes the
+    id lookup (sorted ids plus their rows) and the spatial grid, so a load
+    builds no per-process structures.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        embeddings: np.ndarray,
+        norms_sq: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        vocabs: Dict[str, Dict[str, int]],
+        records,
+        space: str = "l2",
+        embedding: Optional[dict] = None,
+        manifest: Optional[dict] = None,
+        sorted_ids: Optional[np.ndarray] = None,
+        sorted_rows: Optional[np.ndarray] = None,
+        geo: Optional[GeoIndex] = None,
+    ):
+        self.ids = ids
+        self.embeddings = embeddings
+        self.norms_sq = norms_sq
+        self.columns = columns
+        self.vocabs = vocabs
+        self.records = records
+        self.space = space
+        # Embedding provider tags, see utils.embedding_providers
+        self.embedding = embedding
+        self.manifest = manifest or {}
+        # Id lookup: sorted_ids[i] is the id of row sorted_rows[i]
+        if sorted_ids is None or sorted_rows is None:
+            sorted_rows = np.argsort(np.asarray(ids), kind="stable").astype(np.int64)
+            sorted_ids = np.asarray(ids)[sorted_rows]
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+        # Spatial grid over the same rows
+        if geo is None:
+            neighborhood_names = np.array(list(vocabs["neighborhood"]), dtype=str)
+            geo = GeoIndex.from_records(
+                ids,
+                columns["latitude"],
+                columns["longitude"],
+                neighborhood_names[np.asarray(columns["neighborhood_codes"])],
+            )
+        self.geo = geo
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_records(
+        cls,
+        ids: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[dict],
+        documents: List[str],
+        space: str = "l2",
+        embedding: Optional[dict] = None,
+    ) -> "ListingIndex":
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        columns = {
+            name: np.array([m[name] for m in metadatas], dtype=dtype)
+            for name, dtype in NUMERIC_COLUMNS.items()
+        }
+        # Amenity bitmasks; listings ingested before the amenity index have none
+        columns["amenities"] = np.array([m.get("amenities", 0) for m in metadatas], dtype=np.int64)
+        # Categorical columns are stored as integer codes
+        vocabs = {}
+        for name in CATEGORICAL_COLUMNS:
+            columns[f"{name}_codes"], vocabs[name] = _encode([m[name] for m in metadatas])
+
+        return cls(
+            ids=np.array(ids, dtype=str),
+            embeddings=embeddings,
+            norms_sq=np.einsum("ij,ij->i", embeddings, embeddings),
+            columns=columns,
+            vocabs=vocabs,
+            records=InMemoryRecords(metadatas, documents),
+            space=space,
+            embedding=embedding,
+        )
+
+    @classmethod
+    def from_chroma_collection(cls, collection) -> "ListingIndex":
+        records = collection.get(include=["embeddings", "metadatas", "documents"])
+        collection_metadata = collection.metadata or {}
+        return cls.from_records(
+            ids=records["ids"],
+            embeddings=np.asarray(records["embeddings"], dtype=np.float32),
+            metadatas=records["metadatas"],
+            documents=records["documents"],
+            space=collection_metadata.get("hnsw:space", "l2"),
+            embedding={key: value for key, value in collection_metadata.items() if key.startswith("embedding_")},
+        )
+
+    def save(self, path: str, source: Optional[str] = None) -> dict:
+        """Write the index as a versioned artifact directory; returns its manifest.
+
+        Files are written to a sibling temp directory and swapped in at the end,
+        so readers never see a half-written artifact.
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        np.save(os.path.join(tmp_path, "ids.npy"), np.asarray(self.ids))
+        np.save(os.path.join(tmp_path, "embeddings.npy"), np.asarray(self.embeddings))
+        np.save(os.path.join(tmp_path, "norms_sq.npy"), np.asarray(self.norms_sq))
+        np.save(os.path.join(tmp_path, "sorted_ids.npy"), np.asarray(self.sorted_ids))
+        np.save(os.path.join(tmp_path, "sorted_rows.npy"), np.asarray(self.sorted_rows))
+        np.save(os.path.join(tmp_path, "geo_cell_keys.npy"), np.asarray(self.geo.cell_keys))
+        np.save(os.path.join(tmp_path, "geo_cell_rows.npy"), np.asarray(self.geo.cell_rows))
+        for name, column in self.columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(column))
+
+        records_bytes, offsets = self.records.to_bytes()
+        with open(os.path.join(tmp_path, "records.bin"), "wb") as f:
+            f.write(records_bytes)
+        np.save(os.path.join(tmp_path, "record_offsets.npy"), offsets)
+
+        manifest = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "built_at": int(time.time()),
+            "source": source,
+            "count": len(self),
+            "dimension": int(self.embeddings.shape[1]) if len(self) else 0,
+            "space": self.space,
+            "embedding": self.embedding,
+            "columns": sorted(self.columns),
+            "vocabs": self.vocabs,
+            "geo": {"cell_degrees": GEO_CELL_DEGREES, "centroids": self.geo.centroids},
+            "fingerprint": hashlib.sha256(np.asarray(self.embeddings).tobytes() + records_bytes).hexdigest(),
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(path):
+            old_path = f"{path}.old-{os.getpid()}"
+            os.rename(path, old_path)
+            os.rename(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.rename(tmp_path, path)
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "ListingIndex":
+        """Memory-map a saved artifact read-only."""
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Listing index at {path} has format version {manifest.get('format_version')}, "
+                f"expected {INDEX_FORMAT_VERSION}. Rebuild it with load_listings.py --export-index."
+            )
+        if manifest["geo"]["cell_degrees"] != GEO_CELL_DEGREES:
+            raise ValueError(
+                f"Listing index at {path} has {manifest['geo']['cell_degrees']} degree geo cells, "
+                f"expected {GEO_CELL_DEGREES}. Rebuild it with load_listings.py --export-index."
+            )
+
+        def mapped(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        ids = mapped("ids")
+        columns = {name: mapped(name) for name in manifest["columns"]}
+        geo = GeoIndex(
+            ids=ids,
+            latitudes=columns["latitude"],
+            longitudes=columns["longitude"],
+            cell_keys=mapped("geo_cell_keys"),
+            cell_rows=mapped("geo_cell_rows"),
+            centroids={name: tuple(point) for name, point in manifest["geo"]["centroids"].items()},
+        )
+        return cls(
+            ids=ids,
+            embeddings=mapped("embeddings"),
+            norms_sq=mapped("norms_sq"),
+            columns=columns,
+            vocabs=manifest["vocabs"],
+            records=MappedRecords(os.path.join(path, "records.bin"), mapped("record_offsets")),
+            space=manifest["space"],
+            embedding=manifest.get("embedding"),
+            manifest=manifest,
+            sorted_ids=mapped("sorted_ids"),
+            sorted_rows=mapped("sorted_rows"),
+            geo=geo,
+        )
+
+    def row(self, listing_id: str) -> Optional[int]:
+        position = int(np.searchsorted(self.sorted_ids, listing_id))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == listing_id:
+            return int(self.sorted_rows[position])
+        return None
+
+    def mask(self, listing_filter: ListingFilter) -> np.ndarray:
+        columns = self.columns
+        property_type_codes = [self.vocabs["property_type"].get(t, -1) for t in listing_filter.property_types]
+
+        mask = (
+            np.isin(columns["property_type_codes"], property_type_codes)
+            & (columns["price"] >= listing_filter.price_min)
+            & (columns["price"] <= listing_filter.price_max)
+            & (columns["bedrooms"] >= listing_filter.bedrooms_min)
+            & (columns["bathrooms"] >= listing_filter.bathrooms_min)
+        )
+        if listing_filter.city is not None:
+            mask &= columns["city_codes"] == self.vocabs["city"].get(listing_filter.city, -1)
+        if listing_filter.neighborhoods:
+            neighborhood_codes = [self.vocabs["neighborhood"].get(n, -1) for n in listing_filter.neighborhoods]
+            mask &= np.isin(columns["neighborhood_codes"], neighborhood_codes)
+        if listing_filter.centers:
+            mask &= self.geo.mask_within(listing_filter.centers, listing_filter.radius_miles)
+        if listing_filter.sqft_min is not None:
+            mask &= columns["square_feet"] >= listing_filter.sqft_min
+        if listing_filter.amenities_required:
+            required = listing_filter.amenities_required
+            mask &= (columns["amenities"] & required) == required
+        return mask
+
+    def distances(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Distances in the collection's space for `rows` (all rows if None)."""
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        norms_sq = self.norms_sq if rows is None else self.norms_sq[rows]
+        dots = embeddings @ query
+
+        if self.space == "ip":
+            return 1.0 - dots
+        if self.space == "cosine":
+            return 1.0 - dots / (np.sqrt(norms_sq) * np.linalg.norm(query) + 1e-12)
+        return norms_sq - 2.0 * dots + float(query @ query)
+
+    def top_k(self, query_embedding: List[float], rows: np.ndarray, n_results: int, preferred: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """Return (row indices, distances) of the `n_results` nearest rows among `rows`.
+
+        With `preferred` amenity bits, rows are ranked by distance boosted for
+        the preferred amenities they have; the raw distances are returned.
+        """
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        distances = self.distances(query, rows)
+
+        if preferred:
+            nearest = boosted_order(distances, self.columns["amenities"][rows], preferred)[:n_results]
+            return rows[nearest], distances[nearest]
+
+        k = min(n_results, len(rows))
+        nearest = np.argpartition(distances, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return rows[nearest], distances[nearest]
+
+    def to_query_result(self, rows: np.ndarray, distances: np.ndarray) -> dict:
+        # Same keys as the Chroma path, which leaves documents out
+        return {
+            "ids": [[str(self.ids[row]) for row in rows]],
+            "metadatas": [[self.records[row][0] for row in rows]],
+            "distances": [distances.tolist()],
+        }
+
+    def metadata(self, listing_id: str) -> Optional[dict]:
+        row = self.row(listing_id)
+        return self.records[row][0] if row is not None else None
+
+    def query(self, query_embedding: List[float], listing_filter: ListingFilter, n_results: int = 3) -> dict:
+        rows = np.flatnonzero(self.mask(listing_filter))
+        rows, distances = self.top_k(query_embedding, rows, n_results, listing_filter.amenities_preferred)
+        return self.to_query_result(rows, distances)
+
+
+def _encode(values: List[str]) -> tuple[np.ndarray, dict]:
+    vocab: dict = {}
+    codes = np.fromiter((vocab.setdefault(v, len(vocab)) for v in values), dtype=np.int32, count=len(values))
+    return codes, vocab
@@ -0,0 +1,286 @@
+# Standard library imports
+from dataclasses import dataclass, field, replace
+from typing import Callable, List, Optional, Tuple
+
+# Third-party library imports
+import numpy as np
+
+# Local application imports
+from models.property_recommendation import PropertyRecommendation, recommendation_from_metadata
+from models.user_profile import UserProfile
+from utils.amenities import amenity_flag, amenity_mask, amenity_names, boosted_order
+from utils.geo_index import GeoIndex
+
+
+# Query result keys passed along the search pipeline. Documents are left out:
+# nothing downstream reads them and they are the bulk of every result.
+RESULT_KEYS = ("ids", "distances", "metadatas")
+
+PRICE_TOLERANCE = 50000
+SQFT_TOLERANCE = 300
+# Chroma can't rank by amenities, so fetch extra candidates to re-rank
+AMENITY_OVERFETCH = 4
+
+# Relaxation tiers, applied cumulatively when the strict filter comes up short
+RELAXED_PRICE_TOLERANCE_RATIO = 0.2
+RELAXED_RADIUS_FACTOR = 2
+ADJACENT_PROPERTY_TYPES = {
+    "Single Family": ["Townhouse", "Multi-Family"],
+    "Townhouse": ["Single Family", "Condo"],
+    "Condo": ["Townhouse"],
+    "Multi-Family": ["Single Family", "Townhouse"],
+}
+
+
+@dataclass
+class ListingFilter:
+    """Hard constraints on a listing search, independent of the search backend."""
+    city: Optional[str]
+    property_types: List[str]
+    price_min: int
+    price_max: int
+    bedrooms_min: int
+    bathrooms_min: float
+    sqft_min: Optional[int] = None
+    # Amenity bitmasks (see utils.amenities): every required bit must be set;
+    # preferred bits only improve the ranking
+    amenities_required: int = 0
+    amenities_preferred: int = 0
+    # Area: listings in any of `neighborhoods`, and/or within `radius_miles`
+    # of any of `centers` (lat, lon); resolved through a GeoIndex
+    neighborhoods: List[str] = field(default_factory=list)
+    centers: List[Tuple[float, float]] = field(default_factory=list)
+    radius_miles: Optional[float] = None
+
+    @classmethod
+    def from_profile(cls, profile: UserProfile, geo_index: Optional[GeoIndex] = None) -> "ListingFilter":
+        """Build the strict filter from a normalized user profile.
+
+        With a `geo_index`, a location that names a neighborhood searches that
+        neighborhood instead of an exact city match, and a radius is measured
+        from the centroids of the requested neighborhoods.
+        """
+        budget = int(profile.budget)
+        # Must-haves filter, so only near-exact phrases count; good-to-haves only boost
+        must_haves, unmatched = amenity_mask(profile.must_haves)
+        good_to_haves, _ = amenity_mask(profile.good_to_haves, loose=True)
+        if unmatched:
+            print(f"must_haves outside the amenity vocabulary, left to the embedding: {unmatched}")
+
+        city = profile.location
+        neighborhoods = list(profile.neighborhoods)
+        centers = []
+        if geo_index is not None:
+            neighborhoods = [geo_index.neighborhood(name) or name for name in neighborhoods]
+            if city and geo_index.neighborhood(city):
+                neighborhoods = list(dict.fromkeys([geo_index.neighborhood(city)] + neighborhoods))
+                city = None
+            if profile.radius_miles:
+                centers = [point for point in map(geo_index.centroid, neighborhoods) if point]
+                if centers:
+                    # The radius replaces the exact neighborhood match
+                    neighborhoods = []
+        if profile.radius_miles and not centers:
+            print(f"radius_miles without a known neighborhood to measure from, ignored: {profile.neighborhoods}")
+
+        return cls(
+            city=city,
+            property_types=[profile.property_type],
+            price_min=budget - PRICE_TOLERANCE,
+            price_max=budget + PRICE_TOLERANCE,
+            sqft_min=int(profile.sqft) - SQFT_TOLERANCE,
+            bedrooms_min=int(profile.bedrooms),
+            bathrooms_min=int(profile.bathrooms),
+            amenities_required=must_haves,
+            amenities_preferred=good_to_haves,
+            neighborhoods=neighborhoods,
+            centers=centers,
+            radius_miles=profile.radius_miles if centers else None,
+        )
+
+    def relaxations(self) -> List[Tuple[List[str], "ListingFilter"]]:
+        """Progressively looser filters, each with a note for every relaxed constraint.
+
+        Tiers are cumulative: widen the price band, drop the sqft floor, allow
+        adjacent property types, widen the search radius, and finally rank by
+        must-have amenities instead of requiring them. City, neighborhoods and
+        bed/bath floors stay fixed.
+        """
+        tiers = []
+        notes: List[str] = []
+        current = self
+
+        budget = (self.price_min + self.price_max) // 2
+        tolerance = max(int(budget * RELAXED_PRICE_TOLERANCE_RATIO), 2 * PRICE_TOLERANCE)
+        if tolerance > (self.price_max - self.price_min) // 2:
+            current = replace(current, price_min=max(budget - tolerance, 0), price_max=budget + tolerance)
+            notes = notes + [f"price range widened to ${current.price_min:,}-${current.price_max:,}"]
+            tiers.append((notes, current))
+
+        if current.sqft_min is not None:
+            current = replace(current, sqft_min=None)
+            notes = notes + ["no minimum square footage"]
+            tiers.append((notes, current))
+
+        adjacent = [
+            property_type
+            for requested in self.property_types
+            for property_type in ADJACENT_PROPERTY_TYPES.get(requested, [])
+            if property_type not in self.property_types
+        ]
+        if adjacent:
+            adjacent = list(dict.fromkeys(adjacent))
+            current = replace(current, property_types=self.property_types + adjacent)
+            notes = notes + [f"also {', '.join(adjacent)}"]
+            tiers.append((notes, current))
+
+        if self.centers and self.radius_miles:
+            current = replace(current, radius_miles=self.radius_miles * RELAXED_RADIUS_FACTOR)
+            notes = notes + [f"up to {current.radius_miles:g} miles away"]
+            tiers.append((notes, current))
+
+        if self.amenities_required:
+            current = replace(
+                current,
+                amenities_required=0,
+                amenities_preferred=self.amenities_required | self.amenities_preferred,
+            )
+            missing = ", ".join(name.replace("_", " ") for name in amenity_names(self.amenities_required))
+            notes = notes + [f"may lack some must-haves ({missing})"]
+            tiers.append((notes, current))
+
+        return tiers
+
+    def to_chroma_where(self, listing_ids: Optional[List[str]] = None) -> dict:
+        """Chroma `where` filter; `listing_ids` is the spatial prefilter for `centers`."""
+        if len(self.property_types) == 1:
+            property_type_clause = {"property_type": {"$eq": self.property_types[0]}}
+        else:
+            property_type_clause = {"property_type": {"$in": self.property_types}}
+
+        clauses = [
+            property_type_clause,
+            {"price": {"$gte": self.price_min}},
+            {"price": {"$lte": self.price_max}},
+            {"bedrooms": {"$gte": self.bedrooms_min}},
+            {"bathrooms": {"$gte": self.bathrooms_min}},
+        ]
+        if self.city is not None:
+            clauses.append({"city": {"$eq": self.city}})
+        if self.neighborhoods:
+            clauses.append({"neighborhood": {"$in": self.neighborhoods}})
+        if listing_ids is not None:
+            clauses.append({"listing_id": {"$in": listing_ids}})
+        if self.sqft_min is not None:
+            clauses.append({"square_feet": {"$gte": self.sqft_min}})
+        for name in amenity_names(self.amenities_required):
+            clauses.append({amenity_flag(name): {"$eq": True}})
+        return {"$and": clauses}
+
+
+def search_listings(deps, query_embedding: List[float], listing_filter: ListingFilter, n_results: int = 3) -> dict:
+    """Vector search with hard filters, returning Chroma's query result shape.
+
+    Uses the in-memory `ListingIndex` when one is configured on the agent
+    dependencies and falls back to the Chroma collection otherwise. With a
+    `LiveListingTable`, Chroma only returns ids and distances and metadata
+    comes from the table while it is current.
+    """
+    if deps.listing_index is not None:
+        return deps.listing_index.query(query_embedding, listing_filter, n_results)
+
+    # Spatial prefilter: only listings inside the radius reach the vector search
+    listing_ids = None
+    if listing_filter.centers:
+        if deps.geo_index is None:
+            raise ValueError("A radius search needs a geo index on the agent dependencies.")
+        listing_ids = deps.geo_index.ids_within(listing_filter.centers, listing_filter.radius_miles)
+        if not listing_ids:
+            return {key: [[]] for key in RESULT_KEYS}
+
+    listing_collection = deps.chroma_client.get_collection(deps.chroma_db_listings)
+    preferred = listing_filter.amenities_preferred
+    table = deps.listing_table.snapshot() if deps.listing_table is not None else None
+    results = listing_collection.query(
+        query_embeddings=[query_embedding],
+        n_results=n_results * AMENITY_OVERFETCH if preferred else n_results,
+        where=listing_filter.to_chroma_where(listing_ids),
+        include=["distances"] if table is not None else ["metadatas", "distances"]
+    )
+    if table is not None:
+        results = deps.listing_table.hydrate(table, listing_collection, results)
+        keep = [i for i, metadata in enumerate(results["metadatas"][0]) if metadata is not None]
+        results = {key: [[results[key][0][i] for i in keep]] for key in RESULT_KEYS}
+    if not preferred:
+        return results
+
+    masks = [metadata.get("amenities", 0) for metadata in results["metadatas"][0]]
+    order = boosted_order(np.asarray(results["distances"][0]), np.asarray(masks), preferred)[:n_results]
+    return {
+        key: [[results[key][0][i] for i in order]]
+        for key in RESULT_KEYS
+    }
+
+
+def search_listings_relaxed(
+    deps,
+    query_embedding: List[float],
+    listing_filter: ListingFilter,
+    n_results: int = 3,
+    rerank: Optional[Callable[..., dict]] = None,
+    candidates: int = 0,
+) -> dict:
+    """`search_listings`, topped up from looser filters when the strict one comes up short.
+
+    Strict matches come first. Each later tier only adds listings not found
+    yet, so the caller gets the best results in a single call. The result has
+    an extra "relaxed" entry listing, per result, the constraints that were
+    relaxed to find it (empty for strict matches).
+
+    With `rerank`, each tier fetches at least `candidates` listings by
+    distance alone and reorders them with `rerank(results,
+    preferred_amenities=...)` before the best unseen ones are taken.
+    """
+    def search(search_filter: ListingFilter, count: int) -> dict:
+        if rerank is None:
+            return search_listings(deps, query_embedding, search_filter, count)
+        # The reranker scores this tier's preferred amenities itself, so
+        # boosting them in the search too would count them twice
+        unboosted_filter = replace(search_filter, amenities_preferred=0)
+        results = search_listings(deps, query_embedding, unboosted_filter, max(count, candidates))
+        return rerank(results, preferred_amenities=search_filter.amenities_preferred)
+
+    results = search(listing_filter, n_results)
+    merged = {key: [list(results[key][0][:n_results])] for key in RESULT_KEYS}
+    merged["relaxed"] = [[[] for _ in merged["ids"][0]]]
+
+    for notes, relaxed_filter in listing_filter.relaxations():
+        found = len(merged["ids"][0])
+        if found >= n_results:
+            break
+        # Later tiers are supersets, so over-fetch past the listings already found
+        results = search(relaxed_filter, n_results + found)
+        seen = set(merged["ids"][0])
+        for i, listing_id in enumerate(results["ids"][0]):
+            if listing_id in seen or len(merged["ids"][0]) >= n_results:
+                continue
+            for key in RESULT_KEYS:
+                merged[key][0].append(results[key][0][i])
+            merged["relaxed"][0].append(notes)
+
+    return merged
+
+
+def fetch_listing(deps, listing_id: str) -> Optional[PropertyRecommendation]:
+    """Full details of one listing by id, or None if it isn't in the catalogue.
+
+    Always read from the search backend, never from the listing table, so a
+    listing deleted or repriced since the table was loaded can't be booked as it was.
+    """
+    if deps.listing_index is not None:
+        metadata = deps.listing_index.metadata(listing_id)
+    else:
+        listing_collection = deps.chroma_client.get_collection(deps.chroma_db_listings)
+        records = listing_collection.get(ids=[listing_id], include=["metadatas"])
+        metadata = records["metadatas"][0] if records["ids"] else None
+    return recommendation_from_metadata(metadata) if metadata is not None else None
@@ -0,0 +1,183 @@
+# Standard library imports
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# Third-party library imports
+from chromadb.errors import InvalidCollectionException
+
+# Local application imports
+from models.property_recommendation import PropertySummary, summary_from_metadata
+
+
+# load_listings.py stamps this companion collection's metadata with the listing
+# collection's revision: an "ingesting:" revision before its first write and a
+# fresh one after its last, so readers can tell whether a snapshot is current
+LISTING_REVISION_SUFFIX = "_revision"
+LISTING_REVISION_KEY = "revision"
+INGESTING_REVISION_PREFIX = "ingesting:"
+# While there is no usable snapshot, how often to look for a revision to load
+LISTING_TABLE_RETRY_SECONDS = 30.0
+
+
+def listing_revision_collection(collection_name: str) -> str:
+    return f"{collection_name}{LISTING_REVISION_SUFFIX}"
+
+
+def read_listing_revision(client, collection_name: str) -> Optional[str]:
+    """The listing collection's current revision, or None if it was never stamped."""
+    try:
+        marker = client.get_collection(listing_revision_collection(collection_name))
+    except InvalidCollectionException:
+        return None
+    return (marker.metadata or {}).get(LISTING_REVISION_KEY)
+
+
+def stamp_listing_revision(client, collection_name: str, ingesting: bool = False) -> str:
+    """Record a new revision of the listing collection; call with `ingesting` before writing."""
+    revision = f"{INGESTING_REVISION_PREFIX if ingesting else ''}{uuid.uuid4().hex}"
+    marker = client.get_or_create_collection(listing_revision_collection(collection_name))
+    marker.modify(metadata={LISTING_REVISION_KEY: revision})
+    return revision
+
+
+class ListingTable:
+    """Snapshot of the listing catalogue at one revision, keyed by listing_id.
+
+    Holds each listing's metadata, for hydrating id-only query results, and
+    its PropertySummary validated once at load.
+    """
+
+    def __init__(self, metadatas: List[dict], revision: Optional[str] = None):
+        self.revision = revision
+        self.metadatas = metadatas
+        self.summaries = [summary_from_metadata(metadata) for metadata in metadatas]
+        self._row_of: Dict[str, int] = {metadata["listing_id"]: row for row, metadata in enumerate(metadatas)}
+
+    def __len__(self) -> int:
+        return len(self.metadatas)
+
+    def __contains__(self, listing_id: str) -> bool:
+        return listing_id in self._row_of
+
+    @classmethod
+    def from_chroma_collection(cls, collection, revision: Optional[str] = None, page_size: int = 5000) -> "ListingTable":
+        metadatas = []
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metadatas.extend(page["metadatas"])
+            if len(page["ids"]) < page_size:
+                break
+            offset += page_size
+        return cls(metadatas, revision)
+
+    def metadata(self, listing_id: str) -> Optional[dict]:
+        row = self._row_of.get(listing_id)
+        return self.metadatas[row] if row is not None else None
+
+    def hydrate(self, results: dict) -> dict:
+        """Fill in the metadatas of an id-only query result; unknown ids are left as None."""
+        return {**results, "metadatas": [[self.metadata(listing_id) for listing_id in results["ids"][0]]]}
+
+    def summary(self, metadata: dict, relaxed: Optional[List[str]] = None) -> PropertySummary:
+        row = self._row_of.get(metadata["listing_id"])
+        # Only reuse a summary built from this exact version of the listing
+        if row is None or self.metadatas[row].get("content_hash") != metadata.get("content_hash"):
+            return summary_from_metadata(metadata, relaxed)
+        summary = self.summaries[row]
+        # Shared instances are never mutated; per-result notes go on a shallow copy
+        return summary.model_copy(update={"relaxed": relaxed}) if relaxed else summary
+
+    def summarize_results(self, results: dict) -> List[PropertySummary]:
+        """`summarize_chroma_results`, reusing prebuilt summaries for unchanged listings."""
+        metadatas = results["metadatas"][0]
+        relaxed = results.get("relaxed", [[[] for _ in metadatas]])[0]
+        return [self.summary(metadata, notes) for metadata, notes in zip(metadatas, relaxed)]
+
+
+class LiveListingTable:
+    """The `ListingTable` of a Chroma collection, kept in step with its revision.
+
+    Searches query Chroma for ids and distances only, then call `hydrate`,
+    which reads the revision stamp after the query: the snapshot fills in the
+    metadata only if it was loaded at that same finished revision. Otherwise
+    the metadata comes from Chroma and a reload starts in a background thread,
+    so a changed, repriced or deleted listing is never served from the snapshot.
+    """
+
+    def __init__(self, client, collection_name: str, page_size: int = 5000):
+        self.client = client
+        self.collection_name = collection_name
+        self.page_size = page_size
+        self.table: Optional[ListingTable] = None
+        self._loading = threading.Lock()
+        self._next_attempt = 0.0
+
+    def load(self, revision: Optional[str] = None) -> Optional[ListingTable]:
+        """Load a snapshot now, if the collection is at a finished revision."""
+        revision = revision or read_listing_revision(self.client, self.collection_name)
+        if revision is None or revision.startswith(INGESTING_REVISION_PREFIX):
+            print(f"listing table not loaded: collection '{self.collection_name}' revision is {revision}")
+            return None
+        collection = self.client.get_collection(self.collection_name)
+        table = ListingTable.from_chroma_collection(collection, revision, self.page_size)
+        # An ingest that started mid-load makes this snapshot unusable
+        if read_listing_revision(self.client, self.collection_name) != revision:
+            return None
+        self.table = table
+        print(f"loaded {len(table)} listings into the listing table at revision {revision}")
+        return table
+
+    def reload_in_background(self, revision: Optional[str] = None) -> None:
+        if not self._loading.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.load(revision)
+            except Exception as e:
+                print(f"[listing_table] reload failed: {e}")
+            finally:
+                self._loading.release()
+
+        threading.Thread(target=run, name="listing-table-reload", daemon=True).start()
+
+    def snapshot(self) -> Optional[ListingTable]:
+        """The last loaded snapshot, which may be stale; retries loading while there is none."""
+        if self.table is None and time.monotonic() >= self._next_attempt:
+            self._next_attempt = time.monotonic() + LISTING_TABLE_RETRY_SECONDS
+            self.reload_in_background()
+        return self.table
+
+    def hydrate(self, table: ListingTable, listing_collection, results: dict) -> dict:
+        """Metadata for an id-only query result, from `table` if it is still current.
+
+        Listings deleted since the query come back with None metadata.
+        """
+        revision = read_listing_revision(self.client, self.collection_name)
+        current = revision == table.revision
+        if not current and revision is not None and not revision.startswith(INGESTING_REVISION_PREFIX):
+            self.reload_in_background(revision)
+
+        ids = results["ids"][0]
+        results = table.hydrate(results) if current else {**results, "metadatas": [[None] * len(ids)]}
+        missing = [listing_id for listing_id, metadata in zip(ids, results["metadatas"][0]) if metadata is None]
+        if missing:
+            fetched = listing_collection.get(ids=missing, include=["metadatas"])
+            fetched_by_id = dict(zip(fetched["ids"], fetched["metadatas"]))
+            # A listing deleted since the query stays None for the caller to drop
+            results["metadatas"] = [[
+                metadata if metadata is not None else fetched_by_id.get(listing_id)
+                for listing_id, metadata in zip(ids, results["metadatas"][0])
+            ]]
+        return results
+
+    def summarize_results(self, results: dict) -> List[PropertySummary]:
+        table = self.table
+        if table is None:
+            metadatas = results["metadatas"][0]
+            relaxed = results.get("relaxed", [[[] for _ in metadatas]])[0]
+            return [summary_from_metadata(metadata, notes) for metadata, notes in zip(metadatas, relaxed)]
+        return table.summarize_results(results)
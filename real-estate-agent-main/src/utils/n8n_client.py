@@ -0,0 +1,116 @@
+# Standard library imports
+import asyncio
+import random
+from typing import Optional
+
+# Third-party library imports
+import httpx
+
+
+# Connection / retry defaults for the n8n calendar webhook
+N8N_TIMEOUT_SECONDS = 10.0
+N8N_CONNECT_TIMEOUT_SECONDS = 3.0
+N8N_MAX_CONNECTIONS = 20
+N8N_MAX_KEEPALIVE_CONNECTIONS = 10
+N8N_MAX_CONCURRENCY = 10
+N8N_MAX_RETRIES = 3
+N8N_BACKOFF_BASE_SECONDS = 0.25
+N8N_BACKOFF_MAX_SECONDS = 4.0
+
+# Responses worth retrying: throttling and transient upstream failures
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+# Failures where the request never left the client, so even a booking is safe to resend
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class N8nClient:
+    """Shared async client for the n8n webhook.
+
+    Keeps a pooled keep-alive connection open to n8n, caps the number of
+    in-flight requests and retries transient failures with jittered
+    exponential backoff, so a slow calendar lookup never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        timeout: float = N8N_TIMEOUT_SECONDS,
+        connect_timeout: float = N8N_CONNECT_TIMEOUT_SECONDS,
+        max_connections: int = N8N_MAX_CONNECTIONS,
+        max_keepalive_connections: int = N8N_MAX_KEEPALIVE_CONNECTIONS,
+        max_concurrency: int = N8N_MAX_CONCURRENCY,
+        max_retries: int = N8N_MAX_RETRIES,
+        backoff_base: float = N8N_BACKOFF_BASE_SECONDS,
+        backoff_max: float = N8N_BACKOFF_MAX_SECONDS,
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def post(self, url: str, payload: dict, timeout: Optional[float] = None, idempotent: bool = True) -> dict:
+        """POST a JSON payload and return the JSON response.
+
+        Non-idempotent calls (bookings) are only retried when the connection
+        could not be made; a timeout or 5xx may mean n8n already acted on it.
+        """
+        client = self._get_client()
+        request_timeout = httpx.Timeout(timeout) if timeout is not None else self.timeout
+
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await client.post(url, json=payload, timeout=request_timeout)
+
+                if idempotent and response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    print(f"[n8n] {response.status_code} from webhook, retrying (attempt {attempt + 1})")
+                else:
+                    response.raise_for_status()
+                    return response.json()
+
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt >= self.max_retries or not (idempotent or isinstance(e, UNSENT_ERRORS)):
+                    raise
+                print(f"[n8n] {type(e).__name__} calling webhook, retrying (attempt {attempt + 1})")
+
+            await asyncio.sleep(self._backoff_delay(attempt))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_n8n_client: Optional[N8nClient] = None
+
+
+def get_n8n_client() -> N8nClient:
+    global _n8n_client
+    if _n8n_client is None:
+        _n8n_client = N8nClient()
+    return _n8n_client
+
+
+async def close_n8n_client() -> None:
+    if _n8n_client is not None:
+        await _n8n_client.aclose()
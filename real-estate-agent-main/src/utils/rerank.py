@@ -0,0 +1,98 @@
+# Standard library imports
+from typing import Optional
+
+# Third-party library imports
+import numpy as np
+
+# Local application imports
+from models.user_profile import UserProfile
+from utils.amenities import preferred_share
+from utils.lexical_index import LexicalIndex
+from utils.listing_search import RESULT_KEYS
+
+
+# Candidates fetched per search for the reranker to choose from
+RERANK_CANDIDATES = 20
+
+# Blend of the per-candidate signals, each scaled to [0, 1]
+RERANK_WEIGHTS = {
+    "vector": 0.45,
+    "lexical": 0.2,
+    "price": 0.15,
+    "amenities": 0.1,
+    "freshness": 0.1,
+}
+# Listings this many days on the market get half the freshness score
+FRESHNESS_HALF_LIFE_DAYS = 30
+
+
+def min_max(values: np.ndarray) -> np.ndarray:
+    spread = values.max() - values.min() if len(values) else 0.0
+    if spread <= 0:
+        return np.ones_like(values)
+    return (values - values.min()) / spread
+
+
+def lexical_query(profile: UserProfile) -> str:
+    """BM25 query from the caller's own words, the must-haves and good-to-haves.
+
+    The structured fields are already filters or the price signal, and the
+    template words of `profile_to_text` ("bedroom(s)", "budget") would only
+    add noise to the text match.
+    """
+    return " ".join([*profile.must_haves, *profile.good_to_haves])
+
+
+def rerank_scores(
+    distances: np.ndarray,
+    lexical_scores: Optional[np.ndarray],
+    prices: np.ndarray,
+    days_on_market: np.ndarray,
+    budget: int,
+    amenity_share: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Blended relevance per candidate (higher is better), all signals vectorized."""
+    signals = {
+        # Distances only matter relative to the other candidates
+        "vector": 1.0 - min_max(distances),
+        "price": 1.0 - np.minimum(np.abs(prices - budget) / max(budget, 1), 1.0),
+        "freshness": FRESHNESS_HALF_LIFE_DAYS / (FRESHNESS_HALF_LIFE_DAYS + np.maximum(days_on_market, 0)),
+    }
+    if lexical_scores is not None and lexical_scores.max(initial=0.0) > 0:
+        signals["lexical"] = lexical_scores / lexical_scores.max()
+    if amenity_share is not None:
+        signals["amenities"] = amenity_share
+
+    # Renormalize so missing signals (no lexical index, no good-to-haves) don't shrink the rest
+    total_weight = sum(RERANK_WEIGHTS[name] for name in signals)
+    return sum(RERANK_WEIGHTS[name] * signal for name, signal in signals.items()) / total_weight
+
+
+def rerank_results(
+    results: dict,
+    query: str,
+    budget: int,
+    lexical_index: Optional[LexicalIndex] = None,
+    preferred_amenities: int = 0,
+) -> dict:
+    """Reorder a Chroma-shaped query result by `rerank_scores`, best first."""
+    ids = results["ids"][0]
+    if len(ids) < 2:
+        return results
+
+    metadatas = results["metadatas"][0]
+    distances = np.asarray(results["distances"][0], dtype=np.float32)
+    prices = np.fromiter((m["price"] for m in metadatas), dtype=np.float32, count=len(metadatas))
+    days_on_market = np.fromiter((m["days_on_market"] for m in metadatas), dtype=np.float32, count=len(metadatas))
+    lexical_scores = lexical_index.score(ids, query) if lexical_index is not None else None
+    amenity_share = None
+    if preferred_amenities:
+        masks = np.fromiter((m.get("amenities", 0) for m in metadatas), dtype=np.int64, count=len(metadatas))
+        amenity_share = preferred_share(masks, preferred_amenities)
+
+    scores = rerank_scores(distances, lexical_scores, prices, days_on_market, budget, amenity_share)
+    order = np.argsort(-scores, kind="stable")
+    return {
+        key: [[results[key][0][i] for i in order]]
+        for key in RESULT_KEYS
+    }
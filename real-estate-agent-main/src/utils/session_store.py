@@ -0,0 +1,121 @@
+# Standard library imports
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# Third-party library imports
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+
+
+SESSION_IDLE_TTL_SECONDS = 30 * 60
+SESSION_MAX_ENTRIES = 500
+
+
+def estimate_history_bytes(message_history: List[ModelMessage]) -> int:
+    # Serialized size is a good proxy for what the history holds in memory
+    if not message_history:
+        return 0
+    return len(ModelMessagesTypeAdapter.dump_json(message_history))
+
+
+class SessionStore:
+    """Per-call session store with idle-TTL and LRU eviction.
+
+    Sessions are plain dicts (agent, usage, dependencies, message history) plus
+    bookkeeping: last activity time and the approximate size of the history.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        idle_ttl_seconds: float = SESSION_IDLE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.ended = 0
+
+        self._sessions: OrderedDict[str, Dict] = OrderedDict()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session["last_active"] > self.idle_ttl_seconds:
+            self._remove(session_id)
+            self.evicted_idle += 1
+            return None
+        session["last_active"] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: str, factory: Callable[[], Dict]) -> Dict:
+        session = self.get(session_id)
+        if session is not None:
+            return session
+
+        now = time.monotonic()
+        session = factory()
+        session.update({"created_at": now, "last_active": now, "approx_bytes": 0})
+        self._sessions[session_id] = session
+
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+            self.evicted_lru += 1
+        return session
+
+    def update_history(self, session_id: str, message_history: List[ModelMessage]) -> None:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return
+        session["message_history"] = message_history
+        session["approx_bytes"] = estimate_history_bytes(message_history)
+        session["last_active"] = time.monotonic()
+
+    def end(self, session_id: str) -> bool:
+        if self._remove(session_id):
+            self.ended += 1
+            return True
+        return False
+
+    def evict_expired(self) -> int:
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        expired = [sid for sid, session in self._sessions.items() if session["last_active"] < cutoff]
+        for session_id in expired:
+            self._remove(session_id)
+        self.evicted_idle += len(expired)
+        return len(expired)
+
+    def _remove(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        sessions = [
+            {
+                "session_id": session_id,
+                "age_seconds": round(now - session["created_at"], 1),
+                "idle_seconds": round(now - session["last_active"], 1),
+                "messages": len(session["message_history"]),
+                "approx_bytes": session["approx_bytes"],
+                "history_tokens_saved": session.get("history_tokens_saved", 0),
+            }
+            for session_id, session in self._sessions.items()
+        ]
+        return {
+            "live_sessions": len(sessions),
+            "approx_bytes": sum(s["approx_bytes"] for s in sessions),
+            "max_entries": self.max_entries,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+            "ended": self.ended,
+            "sessions": sessions,
+        }
@@ -1,6 +1,9 @@
 # Standard library imports
-from datetime import datetime, timedelta
+import bisect
 import json
+import math
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
 
 # Third-party library imports
 import pytz
@@ -8,38 +11,107 @@ import pytz
 # Local application imports
 from models.agent_schedule_config import AgentScheduleConfig
 from utils.appointment_utils import fetch_busy_slots_from_n8n
+from utils.busy_slot_cache import get_busy_slot_cache
 
 
-def compute_available_slots(
+def merge_busy_intervals(
+    busy_slots: list[tuple[datetime, datetime]],
+    schedule_buffer: timedelta
+) -> list[tuple[datetime, datetime]]:
+    """Pad each busy interval with the buffer, then sort and merge overlaps."""
+    padded = sorted((start - schedule_buffer, end + schedule_buffer) for start, end in busy_slots)
+
+    merged: list[tuple[datetime, datetime]] = []
+    for start, end in padded:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def sweep_free_slots(
+    window_start: datetime,
+    window_end: datetime,
+    merged_busy: list[tuple[datetime, datetime]],
+    duration: timedelta,
+    granularity: timedelta
+) -> Iterator[datetime]:
+    """Yield slot starts on the granularity grid that fit between merged busy intervals.
+
+    `merged_busy` must be sorted and non-overlapping (see `merge_busy_intervals`),
+    so both the grid and the busy list are walked exactly once.
+    """
+    last_start = window_end - duration
+    current = window_start
+    i = bisect.bisect_right(merged_busy, (window_start,)) - 1
+    i = max(i, 0)
+
+    while current <= last_start:
+        # Skip busy intervals that ended before this candidate
+        while i < len(merged_busy) and merged_busy[i][1] <= current:
+            i += 1
+
+        if i < len(merged_busy) and merged_busy[i][0] < current + duration:
+            # Conflict: jump to the first grid point at or after the busy end
+            steps = math.ceil((merged_busy[i][1] - current) / granularity)
+            current += steps * granularity
+            continue
+
+        yield current
+        current += granularity
+
+
+def find_available_slots(
+    start_date: date,
+    agent_schedule_config: AgentScheduleConfig,
+    busy_slots: list[tuple[datetime, datetime]],
+    days: int = 1,
+    max_slots: Optional[int] = None,
+    duration: Optional[timedelta] = None
+) -> list[datetime]:
+    """Return up to `max_slots` free slot starts across `days` working days from `start_date`."""
+    tz = pytz.timezone(agent_schedule_config.timezone)
+    duration = duration or agent_schedule_config.appointment_duration
+    granularity = agent_schedule_config.slot_granularity
+    merged_busy = merge_busy_intervals(busy_slots, agent_schedule_config.schedule_buffer)
+
+    available_slots = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        window_start = tz.localize(datetime.combine(day, agent_schedule_config.work_start))
+        window_end = tz.localize(datetime.combine(day, agent_schedule_config.work_end))
+
+        for slot in sweep_free_slots(window_start, window_end, merged_busy, duration, granularity):
+            available_slots.append(slot)
+            if max_slots is not None and len(available_slots) >= max_slots:
+                return available_slots
+
+    return available_slots
+
+
+async def compute_available_slots(
     parsed_datetime: datetime,
     agent_schedule_config: AgentScheduleConfig,
-    n8n_webhook_url: str
+    n8n_webhook_url: str,
+    days: int = 1,
+    max_slots: Optional[int] = None,
+    duration: Optional[timedelta] = None
 ) -> list[str]:
 
-    work_start = agent_schedule_config.work_start
-    work_end = agent_schedule_config.work_end
-    appointment_duration = agent_schedule_config.appointment_duration
-    schedule_buffer = agent_schedule_config.schedule_buffer
-    timezone = agent_schedule_config.timezone
-
-    tz = pytz.timezone(timezone)
+    tz = pytz.timezone(agent_schedule_config.timezone)
     date = parsed_datetime.astimezone(tz).date()  # just the date portion
-    busy_slots = fetch_busy_slots_from_n8n(parsed_datetime, n8n_webhook_url)
+    busy_slots = await get_busy_slot_cache().get_busy_slots(
+        n8n_webhook_url,
+        date,
+        tz,
+        fetch=lambda start, end: fetch_busy_slots_from_n8n(start, n8n_webhook_url, end),
+        days=days,
+    )
 
-    available_slots = []
-    start_dt = tz.localize(datetime.combine(date, work_start))
-    end_dt = tz.localize(datetime.combine(date, work_end)) - appointment_duration
-
-    current = start_dt
-    while current <= end_dt:
-        proposed_end = current + appointment_duration
-        conflict = any(
-            (current < busy_end + schedule_buffer and proposed_end > busy_start - schedule_buffer)
-            for busy_start, busy_end in busy_slots
-        )
-        if not conflict:
-            available_slots.append(current.isoformat())
-        current += timedelta(minutes=30)
+    slots = find_available_slots(date, agent_schedule_config, busy_slots, days, max_slots, duration)
+    available_slots = [slot.isoformat() for slot in slots]
 
     print(f"agents available slots {available_slots}")
     return available_slots
@@ -1,13 +1,17 @@
 # Standard library imports
+import asyncio
 import os
 import json
+import traceback
+from contextlib import asynccontextmanager
+from dataclasses import replace
 
 # Third-party library imports
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import List, Optional
 import uvicorn
 import chromadb
 import logfire
@@ -17,8 +21,17 @@ from pydantic_ai.usage import Usage
 # Local application imports
 from agent.agent_config import AgentDependencies
 from models.agent_schedule_config import AgentScheduleConfig
+from models.user_profile import UserProfile
 from agent.realtor_agent import realtor_agent
-from agent.agent_cost import compute_cost
+from agent.agent_cost import CostTracker, load_model_costs, usage_delta
+from utils.n8n_client import close_n8n_client
+from utils.embedding_providers import check_embedding_tags, get_embedding_provider
+from utils.geo_index import GeoIndex
+from utils.lexical_index import LexicalIndex
+from utils.listing_index import ListingIndex
+from utils.listing_table import LiveListingTable
+from utils.history_compaction import CompactionStats, compact_message_history
+from utils.session_store import SessionStore
 
 
 logfire.configure(send_to_logfire='if-token-present')
@@ -28,12 +41,61 @@ chroma_db_listings = os.getenv("CHROMA_DB_LISTINGS")
 n8n_webhook_url = os.getenv("N8N_WEBHOOK_URL")
 agent_timezone = os.getenv("AGENT_TIMEZONE")
 port = int(os.getenv("VAPI_EXPOSE_PORT", 8000))
+progress_messages_enabled = os.getenv("VAPI_PROGRESS_MESSAGES", "true").lower() == "true"
+session_idle_ttl_seconds = float(os.getenv("SESSION_IDLE_TTL_SECONDS", 30 * 60))
+session_max_entries = int(os.getenv("SESSION_MAX_ENTRIES", 500))
+history_token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", 6000))
+listing_search_backend = os.getenv("LISTING_SEARCH_BACKEND", "chroma")
+listing_index_path = os.getenv("LISTING_INDEX_PATH")
+lexical_index_path = os.getenv("LEXICAL_INDEX_PATH", "lexical_index")
+geo_index_path = os.getenv("GEO_INDEX_PATH", "geo_index")
+cleanup_on_end_of_call = os.getenv("VAPI_CLEANUP_ON_END_OF_CALL", "true").lower() == "true"
+compact_recommendations = os.getenv("COMPACT_RECOMMENDATIONS", "true").lower() == "true"
+listing_table_enabled = os.getenv("LISTING_TABLE", "false").lower() == "true"
+SESSION_SWEEP_INTERVAL_SECONDS = 60
 
+# Interim lines spoken as soon as a slow tool starts, keyed by tool name
+TOOL_PROGRESS_MESSAGES = {
+    "recommend_properties": "Give me a moment while I pull up some listings for you. ",
+    "get_agent_availability": "Let me check the calendar. ",
+    "schedule_appointment": "One moment while I book that for you. ",
+}
+# Spoken when a turn fails after the response has started streaming
+TURN_FAILED_MESSAGE = "Sorry, I ran into a problem on my end. Could you say that again?"
 
-app = FastAPI()
+
+async def sweep_idle_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        evicted = session_store.evict_expired()
+        if evicted:
+            print(f"evicted {evicted} idle sessions, {len(session_store)} live")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resolve pricing once at startup rather than on every turn
+    try:
+        await load_model_costs()
+    except Exception as e:
+        print(f"[cost] pricing unavailable, reporting tokens only: {e}")
+    sweeper = asyncio.create_task(sweep_idle_sessions())
+    yield
+    sweeper.cancel()
+    # Release pooled n8n connections on shutdown
+    await close_n8n_client()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Session store for multiple callers
-session_store: Dict[str, Dict] = {}
+session_store = SessionStore(
+    max_entries=session_max_entries,
+    idle_ttl_seconds=session_idle_ttl_seconds
+)
+
+# Token and spend metrics per session and in aggregate
+cost_tracker = CostTracker()
 
 class Call(BaseModel):
     id: str
@@ -53,75 +115,200 @@ class VAPIRequest(BaseModel):
     timestamp: int
     stream: bool
 
+class ServerMessage(BaseModel):
+    type: str
+    call: Optional[Call] = None
+
+class VAPIServerEvent(BaseModel):
+    message: ServerMessage
+
 agent_schedule_config = AgentScheduleConfig(
                                 timezone=agent_timezone
                         )
 
+chroma_client = chromadb.PersistentClient(path="chroma_db")
+
+# Optionally serve searches from an in-memory NumPy index instead of Chroma.
+# A prebuilt artifact is mmapped read-only, so uvicorn workers share one copy.
+listing_index = None
+if listing_index_path:
+    listing_index = ListingIndex.load(listing_index_path)
+    print(f"mapped {len(listing_index)} listings from {listing_index_path} (built_at {listing_index.manifest['built_at']})")
+elif listing_search_backend == "numpy":
+    listing_index = ListingIndex.from_chroma_collection(chroma_client.get_collection(chroma_db_listings))
+    print(f"loaded {len(listing_index)} listings into the in-memory index")
+
+# Query vectors must come from the same embedding space the listings were ingested with
+embedding_provider = get_embedding_provider()
+if listing_index is not None:
+    check_embedding_tags(listing_index.embedding, embedding_provider, "Listing index")
+else:
+    listing_collection = chroma_client.get_collection(chroma_db_listings)
+    check_embedding_tags(listing_collection.metadata, embedding_provider, f"Collection '{chroma_db_listings}'")
+
+# Opt-in for the Chroma backend: queries fetch only ids and distances and are
+# hydrated from an in-memory snapshot, reloaded in the background whenever
+# load_listings.py stamps a new collection revision. Costs a copy of the
+# catalogue per worker; a listing index decodes just its hits from the shared mmap.
+listing_table = None
+if listing_table_enabled and listing_index is None:
+    listing_table = LiveListingTable(chroma_client, chroma_db_listings)
+    listing_table.reload_in_background()
+
+# BM25 index written by load_listings.py; without it reranking skips the lexical signal
+lexical_index = None
+if os.path.exists(lexical_index_path):
+    lexical_index = LexicalIndex.load(lexical_index_path)
+    print(f"mapped lexical index over {len(lexical_index)} listings from {lexical_index_path}")
+else:
+    print(f"no lexical index at {lexical_index_path}, reranking without BM25")
+
+# Spatial prefilter for neighborhood/radius searches; the in-memory index carries its own
+geo_index = None
+if listing_index is not None:
+    geo_index = listing_index.geo
+elif os.path.exists(geo_index_path):
+    geo_index = GeoIndex.load(geo_index_path)
+    print(f"mapped geo index over {len(geo_index)} listings from {geo_index_path}")
+else:
+    print(f"no geo index at {geo_index_path}, neighborhood names only match exactly and radius searches are off")
+
 agent_dependencies = AgentDependencies(
-    chroma_client=chromadb.PersistentClient(path="chroma_db"),
+    chroma_client=chroma_client,
     chroma_db_listings=chroma_db_listings,
     n8n_webhook_url=n8n_webhook_url,
-    agent_schedule_config=agent_schedule_config
+    agent_schedule_config=agent_schedule_config,
+    listing_index=listing_index,
+    listing_table=listing_table,
+    lexical_index=lexical_index,
+    geo_index=geo_index,
+    compact_recommendations=compact_recommendations
     )
 
+def build_chunk(session_id: str, created: int, content: str = None, finish_reason: str = None) -> str:
+    chunk = {
+        "id": f"chatcmpl-{session_id}",
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": "gpt-4",
+        "choices": [
+            {
+                "delta": {"content": content} if content is not None else {},
+                "index": 0,
+                "finish_reason": finish_reason,
+            }
+        ]
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def log_turn(session_id: str, user_message: str, output: str, turn_usage: Usage, compaction: CompactionStats):
+    print(f"Caller [{session_id}]: {user_message}")
+    print(f"Agent [{session_id}]: {output}")
+    print(f"history_tokens: {compaction.tokens_before} -> {compaction.tokens_after} (saved {compaction.tokens_saved}, truncated_tool_returns: {compaction.truncated_tool_returns}, dropped_turns: {compaction.dropped_turns})")
+    print(f"turn request_tokens: {turn_usage.request_tokens}, response_tokens: {turn_usage.response_tokens}, requests: {turn_usage.requests}")
+
+
 @app.post("/vapi-webhook/chat/completions")
 async def vapi_webhook(req: VAPIRequest):
     
     session_id = str(req.call.id)
     user_message = req.messages[-1].content
+    created = int(req.timestamp / 1000)
 
     message_history: List[ModelMessage] = []
 
-    # Initialize session if it doesn't exist
-    if session_id not in session_store:
-        session_store[session_id] = {
+    # Initialize session if it doesn't exist (or was evicted)
+    session = session_store.get_or_create(
+        session_id,
+        lambda: {
             "agent": realtor_agent,
             "usage": Usage(),
-            "agent_dependencies": agent_dependencies,
+            # Own profile per call; the shared clients are reused
+            "agent_dependencies": replace(agent_dependencies, profile=UserProfile()),
             "message_history": message_history
         }
-
-    session = session_store[session_id]
+    )
     agent = session["agent"]
     usage = session["usage"]
-    deps = session["agent_dependencies"]
-    message_history = session["message_history"]
-
-    # Run agent (non-streaming)
-    response = await agent.run(
-        user_message,
-        deps=deps,
-        message_history=message_history,
-        usage=usage
+    usage_before = replace(usage)
+    message_history, compaction = compact_message_history(
+        session["message_history"],
+        history_token_budget,
+        profile_facts=session["agent_dependencies"].profile.model_dump(exclude_defaults=True)
     )
+    session["history_tokens_saved"] = session.get("history_tokens_saved", 0) + compaction.tokens_saved
 
-    print(f"Caller [{session_id}]: {user_message}")
-    print(f"Agent [{session_id}]: {response.output}")
+    # SSE chunks produced by the agent run; None marks the end of the turn
+    chunks: asyncio.Queue = asyncio.Queue()
+    announced_tools = set()
 
-    prompt_cost, completion_cost, total_cost = await compute_cost(usage=usage)
-    print(f"prompt_cost: {prompt_cost}, completion_cost: {completion_cost}, total_cost: {total_cost}")
-    print(f"request_tokens: {usage.request_tokens}, response_tokens: {usage.response_tokens}, total_tokens: {usage.total_tokens}, requests: {usage.requests}")
+    async def on_tool_start(tool_name: str):
+        # Speak a filler line once per tool while the backend works
+        message = TOOL_PROGRESS_MESSAGES.get(tool_name)
+        if progress_messages_enabled and message and tool_name not in announced_tools:
+            announced_tools.add(tool_name)
+            await chunks.put(build_chunk(session_id, created, message))
 
-    session["message_history"] = response.all_messages()
+    # Shallow copy: the session's profile object is shared, so tool updates persist
+    deps = replace(session["agent_dependencies"], on_tool_start=on_tool_start)
 
-    final_response = {
-        "id": f"chatcmpl-{session_id}",
-        "object": "chat.completion.chunk",
-        "created": int(req.timestamp / 1000),
-        "model": "gpt-4",
-        "choices": [
-            {
-                "delta": {"content": response.output},
-                "index": 0,
-                "finish_reason": "stop",
-            }
-        ]
-    }
+    async def run_turn() -> str:
+        try:
+            if req.stream:
+                # Forward text deltas as soon as the model produces them
+                async with agent.run_stream(
+                    user_message,
+                    deps=deps,
+                    message_history=message_history,
+                    usage=usage
+                ) as response:
+                    output = ""
+                    async for delta in response.stream_text(delta=True, debounce_by=None):
+                        output += delta
+                        await chunks.put(build_chunk(session_id, created, delta))
+
+                    session_store.update_history(session_id, response.all_messages())
+            else:
+                # Run agent (non-streaming)
+                response = await agent.run(
+                    user_message,
+                    deps=deps,
+                    message_history=message_history,
+                    usage=usage
+                )
+                output = response.output
+                session_store.update_history(session_id, response.all_messages())
+                await chunks.put(build_chunk(session_id, created, output))
+            return output
+        finally:
+            await chunks.put(None)
 
     async def stream():
-        yield f"data: {json.dumps(final_response)}\n\n"
+        turn = asyncio.create_task(run_turn())
+        try:
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+            try:
+                output = await turn
+            except Exception as e:
+                # Headers are already sent, so end the stream cleanly with a spoken fallback
+                print(f"[{session_id}] turn failed: {e!r}")
+                traceback.print_exception(e)
+                output = TURN_FAILED_MESSAGE
+                yield build_chunk(session_id, created, TURN_FAILED_MESSAGE)
+        finally:
+            # Caller hung up mid-turn: the generator is closed, so stop the agent run
+            if not turn.done():
+                turn.cancel()
+
+        yield build_chunk(session_id, created, finish_reason="stop")
         yield "data: [DONE]\n\n"
 
+        turn_usage = usage_delta(usage_before, usage)
+        cost_tracker.record(session_id, turn_usage)
+        log_turn(session_id, user_message, output, turn_usage, compaction)
+
     return StreamingResponse(
         stream(),
         media_type="text/event-stream",
@@ -131,5 +318,24 @@ async def vapi_webhook(req: VAPIRequest):
         },
     )
 
+@app.post("/vapi-webhook/events")
+async def vapi_events(event: VAPIServerEvent):
+    # Drop the session as soon as VAPI reports the call has ended
+    if cleanup_on_end_of_call and event.message.type == "end-of-call-report" and event.message.call:
+        if session_store.end(str(event.message.call.id)):
+            print(f"session [{event.message.call.id}] ended, {len(session_store)} live")
+    return {"status": "ok"}
+
+
+@app.get("/sessions")
+async def sessions():
+    return session_store.stats()
+
+
+@app.get("/metrics/costs")
+async def costs():
+    return cost_tracker.snapshot()
+
+
 if __name__ == "__main__":
     uvicorn.run("voice_vapi:app", host="0.0.0.0", port=port, reload=True)